@@ -0,0 +1,5 @@
+"""Helpers for building the Brazil Macrobond dashboard.
+
+Submodules are imported on demand so that pulling in one helper does not
+drag pandas, matplotlib or the Macrobond client along with it.
+"""
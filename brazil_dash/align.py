@@ -0,0 +1,195 @@
+"""Local, vectorized frequency alignment of already fetched series.
+
+The ratio sections (trade balance, current account, budget and debt as %
+of GDP) used to send a ``get_unified_series`` request each, downloading
+GDP again only to have Macrobond put it on a common calendar.  ``align``
+does the same with NumPy/pandas on series we already hold:
+
+* calendar merge: keep the dates available in ``all`` series or in ``any``;
+* upsampling: ``linear`` interpolation between observations or ``step``
+  (every higher frequency period repeats its lower frequency value);
+* downsampling: ``sum`` (flows), ``average``, ``last`` or ``first``.
+
+Observations are dated at the start of their period, like the Macrobond
+data frames.  The Macrobond method names used by ``Input``
+(``'linear_interpolation'``, ``'same'``, ``'flow'``, ...) are accepted as
+well.
+"""
+
+from .metadata import FREQUENCIES, frequency_rank
+
+ALL = 'all'
+ANY = 'any'
+
+# months per period of the month based frequencies
+MONTHS = {'annual': 12, 'semiannual': 6, 'quadmonthly': 4, 'quarterly': 3, 'bimonthly': 2, 'monthly': 1}
+
+UP_METHODS = {
+    'linear': 'linear',
+    'step': 'step',
+    'linear_interpolation': 'linear',
+    'same': 'step',
+    'auto': 'step',
+}
+DOWN_METHODS = {
+    'sum': 'sum',
+    'average': 'average',
+    'last': 'last',
+    'first': 'first',
+    'flow': 'sum',
+    'auto': 'last',
+}
+
+
+def _method(methods, name):
+    try:
+        return methods[str(name).lower()]
+    except KeyError:
+        raise ValueError('unsupported conversion method %r, use one of %s' % (name, ', '.join(methods))) from None
+
+
+############ calendars ############
+
+def period_start(index, frequency):
+    """Start of the ``frequency`` period each timestamp of ``index`` falls in (time zone preserved)."""
+    import numpy as np
+    import pandas as pd
+
+    tz = index.tz
+    naive = index.tz_localize(None) if tz is not None else index
+    if frequency in MONTHS:
+        months = naive.to_numpy().astype('datetime64[M]').astype('int64')
+        months = months // MONTHS[frequency] * MONTHS[frequency]
+        starts = pd.DatetimeIndex(months.astype('datetime64[M]').astype('datetime64[ns]'))
+    elif frequency == 'weekly':
+        starts = naive.normalize() - pd.to_timedelta(np.asarray(naive.weekday), unit='D')
+    else:
+        starts = naive.normalize()
+    return starts.tz_localize(tz) if tz is not None else starts
+
+
+def period_end(starts, frequency):
+    """Start of the period after each of ``starts``."""
+    import pandas as pd
+
+    if frequency in MONTHS:
+        return starts + pd.DateOffset(months=MONTHS[frequency])
+    if frequency == 'weekly':
+        return starts + pd.Timedelta(days=7)
+    return starts + pd.Timedelta(days=1)
+
+
+def calendar(frequency, start, end):
+    """Observation dates (period starts) of ``frequency`` from the period containing ``start`` up to ``end``."""
+    import pandas as pd
+
+    first = period_start(pd.DatetimeIndex([start]), frequency)[0]
+    if frequency in MONTHS:
+        return pd.date_range(first, end, freq='%dMS' % MONTHS[frequency])
+    if frequency == 'weekly':
+        return pd.date_range(first, end, freq='7D')
+    return pd.bdate_range(first, end, tz=first.tz)
+
+
+############ conversions ############
+
+def _nanoseconds(index):
+    # as floats, for np.interp; pandas may hold the dates in any resolution
+    return index.as_unit('ns').asi8.astype('float64')
+
+
+def upsample(values, frequency, target, method='linear'):
+    """``values`` at a higher ``target`` frequency, covering every period of the source observations."""
+    import numpy as np
+    import pandas as pd
+
+    method = _method(UP_METHODS, method)
+    values = values.dropna().sort_index()
+    if not len(values):
+        return values.iloc[:0]
+    source = period_start(values.index, frequency)
+    last = period_end(source[-1:], frequency)[0]
+    dates = calendar(target, source[0], last)
+    dates = dates[dates < last]
+    if method == 'linear':
+        # straight lines between the observations, nothing after the last one
+        result = np.interp(
+            _nanoseconds(dates), _nanoseconds(source), values.to_numpy(dtype='float64'),
+            left=np.nan, right=np.nan,
+        )
+    else:
+        positions = source.get_indexer(period_start(dates, frequency))
+        result = np.where(positions >= 0, values.to_numpy(dtype='float64')[positions], np.nan)
+    return pd.Series(result, index=dates, name=values.name)
+
+
+def downsample(values, frequency, target, method='last', partial=False):
+    """``values`` at a lower ``target`` frequency.
+
+    Periods missing some of their observations are dropped unless
+    ``partial`` is set (only checked between month based frequencies).
+    """
+    import numpy as np
+    import pandas as pd
+
+    method = _method(DOWN_METHODS, method)
+    values = values.dropna().sort_index()
+    if not len(values):
+        return values.iloc[:0]
+    keys = period_start(values.index, target)
+    codes, uniques = pd.factorize(keys, sort=True)
+    data = values.to_numpy(dtype='float64')
+    counts = np.bincount(codes, minlength=len(uniques))
+    if method == 'sum':
+        result = np.bincount(codes, weights=data, minlength=len(uniques))
+    elif method == 'average':
+        result = np.bincount(codes, weights=data, minlength=len(uniques)) / counts
+    else:
+        # the rows are in date order, so the last (first) row of each period is where its code ends (starts)
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        if method == 'last':
+            result = data[np.append(boundaries - 1, len(data) - 1)]
+        else:
+            result = data[np.insert(boundaries, 0, 0)]
+    result = pd.Series(result, index=pd.DatetimeIndex(uniques), name=values.name)
+    if not partial and frequency in MONTHS and target in MONTHS:
+        result = result[counts == MONTHS[target] // MONTHS[frequency]]
+    return result
+
+
+def convert(values, frequency, target, up='linear', down='last'):
+    """``values`` (observed at ``frequency``) at the ``target`` frequency."""
+    if frequency == target:
+        return values.dropna()
+    if frequency_rank(target) > frequency_rank(frequency):
+        return upsample(values, frequency, target, up)
+    return downsample(values, frequency, target, down)
+
+
+def align(series, frequencies, target=None, merge=ALL, up=None, down=None):
+    """Put ``{column: date-indexed Series}`` on one calendar and return it as a DataFrame.
+
+    ``frequencies`` gives each column's natural frequency and ``target`` the
+    common one (default: the highest).  ``up`` and ``down`` are a method
+    name or ``{column: method}``; columns without one are interpolated
+    linearly when upsampled and take the last value when downsampled.
+    With ``merge=ALL`` only dates where every column has a value are kept.
+    """
+    import pandas as pd
+
+    if merge not in (ALL, ANY):
+        raise ValueError('merge has to be %r or %r' % (ALL, ANY))
+    target = target or max((frequencies[c] for c in series), key=frequency_rank)
+    if target not in FREQUENCIES:
+        raise ValueError('unknown series frequency %r' % target)
+    up = up if isinstance(up, dict) else {c: up for c in series}
+    down = down if isinstance(down, dict) else {c: down for c in series}
+    columns = {
+        column: convert(values, frequencies[column], target, up.get(column) or 'linear', down.get(column) or 'last')
+        for column, values in series.items()
+    }
+    frame = pd.concat(columns, axis=1, join='inner' if merge == ALL else 'outer').sort_index()
+    if merge == ALL:
+        frame = frame.dropna()
+    frame.index.name = 'date'
+    return frame
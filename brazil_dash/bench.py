@@ -0,0 +1,208 @@
+"""Stage-level benchmarks of the dashboard on a fixed offline dataset.
+
+Every section, and the whole dashboard, is run against ``MockMacrobond``
+with separate timings for each stage:
+
+* ``align``: the fetch plan (resolving the series frequencies and picking
+  the conversions) plus putting the multi series sections on a common
+  calendar with ``brazil_dash.align``;
+* ``fetch``: the plan's bulk requests through a cold ``SeriesCache``
+  (conversions done by Macrobond in unified requests count here);
+* ``transform``: the sections' pipelines (pct_change, ratio to GDP,
+  scaling, ...);
+* ``render``: drawing the charts with matplotlib and encoding them.
+
+The dataset is generated before any timing starts, and each stage reports
+the fastest of ``repeat`` runs.  ``length`` sets the number of observations
+per series and ``countries`` replicates every section for that many
+countries, to see how the stages scale.
+
+Results can be saved as a baseline JSON; ``compare`` (and ``--baseline`` on
+the command line) reports every stage that got slower than the baseline by
+more than ``threshold``::
+
+    python -m brazil_dash.bench --baseline bench.json --update
+    python -m brazil_dash.bench --baseline bench.json --threshold 0.25
+"""
+
+import argparse
+import io
+import json
+import shutil
+import sys
+import tempfile
+import time
+
+from .cache import SeriesCache
+from .metadata import MetadataResolver
+from .mock import MockMacrobond
+from .planner import FetchPlan
+from .sections import SECTIONS, Input, Section
+
+STAGES = ('align', 'fetch', 'transform', 'render')
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.2  # 20% slower than the baseline is a regression
+MIN_DELTA = 0.005  # seconds, smaller differences are noise
+
+
+def replicate(sections, countries):
+    """``sections`` plus copies for ``countries - 1`` made up countries (codes and names get a ``cN`` prefix)."""
+    sections = list(sections)
+    copies = []
+    for n in range(1, countries):
+        prefix = 'c%d' % n
+        for s in sections:
+            inputs = [Input(i.column, prefix + i.code[2:], i.to_higher_frequency) for i in s.inputs]
+            copies.append(Section('%s_%s' % (prefix, s.name), inputs, s.transforms, s.chart, s.currency))
+    return sections + copies
+
+
+def _best(fn, repeat):
+    # (fastest wall time of ``repeat`` calls, result of the last call)
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _render(sections, frames):
+    from .render import draw
+
+    for section in sections:
+        buffer = io.BytesIO()
+        draw(section.chart, frames[section.name]).savefig(buffer, format='png')
+
+
+class _Run:
+    # one offline environment: the mock backend plus scratch cache directories
+
+    def __init__(self, sections, length, latency):
+        self.sections = sections
+        self.client = MockMacrobond(length=length, latency=latency)
+        for code in {c for s in sections for c in s.codes}:
+            self.client.series(code)  # the dataset is built before anything is timed
+        self.directory = tempfile.mkdtemp(prefix='brazil_dash_bench_')
+        self.resolver = MetadataResolver(self.directory, client=self.client)
+        self.resolver.resolve(list(self.client.data))
+
+    def cache(self):
+        # a fresh directory each time, so every fetch is a cold one
+        return SeriesCache(tempfile.mkdtemp(dir=self.directory), client=self.client, metadata=self.resolver)
+
+    def stages(self, sections, repeat):
+        timings = {}
+        planning, plan = _best(lambda: FetchPlan(sections, resolver=self.resolver), repeat)
+        timings['fetch'], downloaded = _best(lambda: plan.download(self.cache()), repeat)
+        aligning, raw = _best(lambda: plan.assemble(downloaded), repeat)
+        timings['align'] = planning + aligning
+        timings['transform'], frames = _best(lambda: {s.name: s.transform(raw[s.name]) for s in sections}, repeat)
+        timings['render'], _ = _best(lambda: _render(sections, frames), repeat)
+        timings['total'] = sum(timings[stage] for stage in STAGES)
+        return timings
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def run_benchmark(sections=SECTIONS, length=None, countries=1, repeat=DEFAULT_REPEAT, latency=0.0,
+                  per_section=True):
+    """Time every stage for the whole dashboard and (with ``per_section``) for each section on its own.
+
+    Returns ``{'params': ..., 'dashboard': {stage: seconds}, 'sections': {name: {stage: seconds}}}``.
+    ``latency`` adds a simulated round trip to every backend call.
+    """
+    sections = replicate(sections, countries)
+    run = _Run(sections, length, latency)
+    try:
+        results = {
+            'params': {
+                'sections': len(sections),
+                'length': length,
+                'countries': countries,
+                'repeat': repeat,
+                'latency': latency,
+            },
+            'dashboard': run.stages(sections, repeat),
+            'sections': {},
+        }
+        if per_section:
+            for section in sections:
+                results['sections'][section.name] = run.stages([section], repeat)
+        return results
+    finally:
+        run.close()
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, min_delta=MIN_DELTA):
+    """``[(scope, stage, baseline seconds, current seconds)]`` for every stage that regressed.
+
+    A stage regresses when it is more than ``threshold`` (relative) and
+    ``min_delta`` seconds slower than in the baseline.  Results are only
+    comparable when they were made with the same parameters.
+    """
+    if results['params'] != baseline['params']:
+        raise ValueError('benchmark parameters differ from the baseline: %r != %r' % (
+            results['params'], baseline['params']))
+    scopes = {'dashboard': (results['dashboard'], baseline['dashboard'])}
+    for name, timings in baseline['sections'].items():
+        if name in results['sections']:
+            scopes[name] = (results['sections'][name], timings)
+    regressions = []
+    for scope, (current, before) in scopes.items():
+        for stage, seconds in before.items():
+            now = current.get(stage)
+            if now is not None and now > seconds * (1 + threshold) and now - seconds > min_delta:
+                regressions.append((scope, stage, seconds, now))
+    return regressions
+
+
+def format_results(results):
+    """Table of the stage timings in milliseconds."""
+    rows = [('dashboard', results['dashboard'])] + sorted(results['sections'].items())
+    width = max(len(name) for name, _ in rows)
+    lines = ['%-*s  %s' % (width, '', '  '.join('%10s' % stage for stage in STAGES + ('total',)))]
+    for name, timings in rows:
+        lines.append('%-*s  %s' % (width, name, '  '.join(
+            '%10.1f' % (timings[stage] * 1000) for stage in STAGES + ('total',))))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m brazil_dash.bench', description=__doc__.splitlines()[0])
+    parser.add_argument('--length', type=int, default=None, help='observations per series (default: 1990 to 2024)')
+    parser.add_argument('--countries', type=int, default=1, help='replicate the dashboard for this many countries')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='runs per stage, the fastest counts')
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated seconds per backend call')
+    parser.add_argument('--dashboard-only', action='store_true', help='skip the per section timings')
+    parser.add_argument('--baseline', help='baseline JSON to compare against (or to write with --update)')
+    parser.add_argument('--update', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative slowdown that counts as a regression')
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(length=args.length, countries=args.countries, repeat=args.repeat,
+                            latency=args.latency, per_section=not args.dashboard_only)
+    print(format_results(results))
+    if not args.baseline:
+        return 0
+    if args.update:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print('baseline written to %s' % args.baseline)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for scope, stage, before, now in regressions:
+        print('REGRESSION %s %s: %.1f ms -> %.1f ms (%+.0f%%)' % (
+            scope, stage, before * 1000, now * 1000, (now / before - 1) * 100))
+    if not regressions:
+        print('no regressions against %s (threshold %.0f%%)' % (args.baseline, args.threshold * 100))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""Incremental dashboard builds.
+
+Each section depends on its series codes and on its own declaration (inputs,
+transforms, chart spec).  A build manifest in the output directory records,
+per section, the stamp of every input and a hash of the declaration used for
+the artifacts on disk.  The next run only fetches, transforms and renders the
+sections where any of these changed; the rest keep their previous artifacts.
+
+Input stamps are the Macrobond revision stamps from the (batched, cached)
+metadata, so unchanged sections are skipped without downloading any data.
+Series without revision stamps are fetched and identified by a hash of
+their content instead.
+"""
+
+import hashlib
+import json
+import os
+
+from .cache import request_key, revision_stamp
+from .files import atomic_write
+from .planner import FetchPlan
+from .trace import get_tracer
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def dependency_graph(sections):
+    """``{section name: [series codes]}``."""
+    return {section.name: list(dict.fromkeys(section.codes)) for section in sections}
+
+
+def content_stamp(values):
+    """Hash of a pandas Series or DataFrame (index and values)."""
+    import pandas as pd
+
+    hashed = pd.util.hash_pandas_object(values, index=True).to_numpy()
+    return 'sha256:' + hashlib.sha256(hashed.tobytes()).hexdigest()
+
+
+class BuildManifest:
+    """What each section's artifacts in ``out_dir`` were built from."""
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.path = os.path.join(out_dir, MANIFEST_FILE)
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def spec_hash(section, formats):
+        return request_key('section', section, list(formats))
+
+    def is_current(self, section, stamps, spec):
+        """True if the section was built from exactly these inputs and spec and its artifacts still exist."""
+        entry = self.entries.get(section.name)
+        return (
+            entry is not None
+            and entry['spec'] == spec
+            and entry['inputs'] == stamps
+            and all(os.path.exists(p) for p in entry['artifacts'])
+        )
+
+    def record(self, section, stamps, spec, artifacts):
+        self.entries[section.name] = {'inputs': stamps, 'spec': spec, 'artifacts': list(artifacts)}
+
+    def artifacts(self, name):
+        return self.entries.get(name, {}).get('artifacts', [])
+
+    def save(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        with atomic_write(self.path) as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+
+
+class BuildResult:
+    """Outcome of ``incremental_build``."""
+
+    def __init__(self):
+        self.built = []
+        self.skipped = []
+        self.artifacts = {}  # section name -> paths, rebuilt or reused
+        self.plan = None  # the FetchPlan used, None when nothing had to be fetched
+        self.pdf = None
+
+    def summary(self):
+        return '%d sections rebuilt, %d unchanged' % (len(self.built), len(self.skipped))
+
+
+def incremental_build(sections, cache, resolver, out_dir, formats=('png',), pdf=None, workers=None, force=False,
+                      fetcher=None, store=None, derived=None):
+    """Rebuild the charts of the ``sections`` whose inputs or declaration changed.
+
+    ``pdf`` optionally names a multi-page PDF (inside ``out_dir``) with every
+    chart; it is rewritten whenever any section was rebuilt, which loads,
+    transforms and draws the unchanged sections too, so leave it off for
+    runs that should only touch what changed.  ``force``
+    rebuilds everything.  ``fetcher`` sends the bulk requests concurrently and
+    ``store`` serves the plain series from the local columnar store.
+    ``derived`` (a ``DerivedStore``) recomputes the transformed frames only
+    from the first new or revised observation on.
+    """
+    tracer = get_tracer()
+    sections = list(sections)
+    with tracer.span('metadata'):
+        metadata = resolver.resolve([code for s in sections for code in s.codes])
+
+    def load(subset):
+        with tracer.span('plan', sections=len(subset)):
+            plan = FetchPlan(subset, resolver=resolver)
+        with tracer.span('fetch', requests=plan.requests):
+            downloaded = plan.download(cache, fetcher, store)
+        with tracer.span('align', sections=len(plan.local)) as span:
+            raw = plan.assemble(downloaded)
+            span.set(rows=sum(len(frame) for frame in raw.values()))
+        return plan, raw
+
+    return build_sections(sections, metadata, load, out_dir, formats, pdf, workers, force, derived)
+
+
+def stale_sections(sections, metadata, manifest, formats, force=False):
+    """The ``sections`` whose artifacts in ``manifest`` were not built from the current revisions and spec."""
+    revisions = {code: revision_stamp(m) for code, m in metadata.items()}
+    stale = []
+    for section in sections:
+        stamps = {code: revisions[code] for code in section.codes}
+        spec = manifest.spec_hash(section, formats)
+        if force or None in stamps.values() or not manifest.is_current(section, stamps, spec):
+            stale.append(section)
+    return stale
+
+
+def build_sections(sections, metadata, load, out_dir, formats=('png',), pdf=None, workers=None, force=False,
+                   derived=None):
+    """The build behind ``incremental_build``, with the data coming from ``load``.
+
+    ``metadata`` holds the entity metadata of every input series and
+    ``load(sections)`` returns ``(fetch plan or None, {section name: input
+    frame})`` for the sections it is given.
+    """
+    from .render import render_all, render_pdf
+
+    tracer = get_tracer()
+    transform = derived.transform if derived is not None else (lambda section, frame: section.transform(frame))
+    sections = list(sections)
+    manifest = BuildManifest(out_dir)
+    result = BuildResult()
+    revisions = {code: revision_stamp(m) for code, m in metadata.items()}
+    specs = {s.name: manifest.spec_hash(s, formats) for s in sections}
+
+    candidates = stale_sections(sections, metadata, manifest, formats, force)
+    result.skipped.extend(s.name for s in sections if s not in candidates)
+
+    frames = {}
+    if candidates:
+        result.plan, raw = load(candidates)
+        charts = {}
+        stamps_by_section = {}
+        for section in candidates:
+            stamps = {}
+            for inp in section.inputs:
+                stamps[inp.code] = revisions[inp.code] or content_stamp(raw[section.name][inp.column])
+            stamps_by_section[section.name] = stamps
+            if not force and manifest.is_current(section, stamps, specs[section.name]):
+                result.skipped.append(section.name)  # no revision stamps, but the content is unchanged
+                continue
+            with tracer.span('transform', section=section.name):
+                frames[section.name] = transform(section, raw[section.name])
+            charts[section.name] = (section.chart, frames[section.name])
+
+        timings = {}
+        with tracer.span('render_all', charts=len(charts)):
+            rendered = render_all(charts, out_dir, formats=formats, workers=workers, timings=timings)
+        for name, paths in rendered.items():
+            tracer.record('render', timings[name], section=name)
+            section = next(s for s in candidates if s.name == name)
+            manifest.record(section, stamps_by_section[name], specs[name], paths)
+            result.built.append(name)
+        manifest.save()
+
+    for section in sections:
+        result.artifacts[section.name] = manifest.artifacts(section.name)
+
+    if pdf is not None:
+        pdf_path = os.path.join(out_dir, pdf)
+        if result.built or not os.path.exists(pdf_path):
+            missing = [s for s in sections if s.name not in frames]
+            if missing:
+                # skipped sections are served from the local cache
+                _, raw = load(missing)
+                for s in missing:
+                    with tracer.span('transform', section=s.name):
+                        frames[s.name] = transform(s, raw[s.name])
+            with tracer.span('render_pdf', charts=len(sections)):
+                result.pdf = render_pdf({s.name: (s.chart, frames[s.name]) for s in sections}, pdf_path)
+        else:
+            result.pdf = pdf_path
+    return result
@@ -0,0 +1,294 @@
+"""Persistent on-disk cache in front of the Macrobond series calls.
+
+Every request is keyed by the series name(s) plus all request parameters
+(currency, calendar merge mode, missing value method, start/end point, ...),
+so two cells asking for the same thing share one download.  Entries younger
+than ``ttl`` seconds are served straight from disk.  Older entries are
+revalidated against the series' last-modified/revision stamps and only
+downloaded again when Macrobond reports a change.  Callers that already
+know the current stamps (a fetch plan resolves them for every series) pass
+them as ``revisions``; entries stored from another revision are then
+downloaded again however young they are.  The cache directory is
+kept under ``max_bytes`` by evicting the least recently used entries.
+"""
+
+import datetime
+import enum
+import hashlib
+import json
+import os
+import threading
+import time
+import types
+
+from .files import atomic_write, read_pickle, write_pickle
+from .trace import get_tracer
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'BRAZIL_DASH_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'brazil_dash')
+)
+DEFAULT_TTL = 6 * 60 * 60  # six hours, a nightly refresh revalidates everything
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# metadata attributes that change whenever Macrobond publishes new or revised values
+REVISION_ATTRIBUTES = (
+    'LastModifiedTimeStamp',
+    'LastRevisionTimeStamp',
+    'LastRevisionAdjustmentTimeStamp',
+)
+
+INDEX_FILE = 'index.json'
+
+
+def default_client():
+    """Return the ``macrobond_data_api`` module, imported on first use."""
+    import macrobond_data_api
+
+    return macrobond_data_api
+
+
+def api_types(client):
+    """Request types (``SeriesEntry``, ``StartOrEndPoint``, enums) matching ``client``.
+
+    Offline clients such as ``MockMacrobond`` carry their own copies as
+    attributes; for the real module they come from ``macrobond_data_api.common``.
+    """
+    if getattr(client, 'SeriesEntry', None) is not None:
+        return client
+    from macrobond_data_api.common import enums
+    from macrobond_data_api.common.types import SeriesEntry, StartOrEndPoint
+
+    return types.SimpleNamespace(
+        SeriesEntry=SeriesEntry,
+        StartOrEndPoint=StartOrEndPoint,
+        **{name: getattr(enums, name) for name in (
+            'SeriesFrequency',
+            'CalendarMergeMode',
+            'CalendarDateMode',
+            'SeriesMissingValueMethod',
+            'SeriesToHigherFrequencyMethod',
+            'SeriesToLowerFrequencyMethod',
+            'SeriesPartialPeriodsMethod',
+        )}
+    )
+
+
+def _normalize(value):
+    # turns request parameters (enums, SeriesEntry, StartOrEndPoint, ...) into
+    # plain JSON so they can be hashed into a stable cache key
+    if isinstance(value, enum.Enum):
+        return type(value).__name__ + '.' + value.name
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    fields = getattr(type(value), '__slots__', None) or sorted(getattr(value, '__dict__', {}))
+    if fields:
+        return {type(value).__name__: {f: _normalize(getattr(value, f, None)) for f in fields}}
+    return repr(value)
+
+
+def request_key(kind, *args, **kwargs):
+    """Hash a request (call name, positional and keyword parameters) into a cache key."""
+    payload = json.dumps([kind, _normalize(args), _normalize(kwargs)], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def revision_stamp(metadata):
+    """Build a comparable revision string from an entity's metadata, or None if it has no stamps."""
+    stamps = [metadata.get(attr) for attr in REVISION_ATTRIBUTES]
+    if not any(stamps):
+        return None
+    return '|'.join('' if s is None else str(s) for s in stamps)
+
+
+class FetchError(Exception):
+    """Raised when Macrobond returns an error instead of a series."""
+
+
+def _entry_names(entries):
+    return [e if isinstance(e, str) else e.name for e in entries]
+
+
+class SeriesCache:
+    """Disk-backed cache for ``get_one_series`` and ``get_unified_series`` results.
+
+    ``client`` is anything exposing the ``macrobond_data_api`` functions and
+    defaults to that module itself.  When a ``metadata`` resolver is given,
+    stale entries are revalidated against its (batched, cached) metadata
+    instead of a separate ``get_entities`` call.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, client=None,
+                 metadata=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.metadata = metadata
+        self._client = client
+        self._lock = threading.RLock()  # the index is shared by concurrent fetches
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = default_client()
+        return self._client
+
+    ############ public API, mirrors the Macrobond calls used in Brazil.py ############
+
+    def get_one_series(self, name, revisions=None):
+        """Return the ``values_to_pd_data_frame()`` frame of a single series."""
+        return self.get_many_series([name], revisions)[name]
+
+    def get_many_series(self, names, revisions=None):
+        """Return ``{name: frame}`` for several series, downloading every miss in one bulk call.
+
+        ``revisions`` maps names to their current ``revision_stamp``.
+        """
+        names = list(dict.fromkeys(names))
+        keys = {name: request_key('get_one_series', name) for name in names}
+        found = self._probe(keys, {name: [name] for name in names}, revisions)
+
+        missing = [name for name in names if name not in found]
+        if missing:
+            downloaded = list(self.client.get_many_series(missing))
+            now = time.time()
+            with self._lock:
+                for name, series in zip(missing, downloaded):
+                    if series.is_error:
+                        raise FetchError('%s: %s' % (name, series.error_message))
+                    found[name] = series.values_to_pd_data_frame()
+                    self._write(keys[name], found[name], revision_stamp(series.metadata), now)
+                self._save_index()
+        return found
+
+    def get_unified_series(self, *series_entries, revisions=None, **kwargs):
+        """Return the ``to_pd_data_frame()`` frame of a unified series request (``revisions`` as above)."""
+        key = request_key('get_unified_series', *series_entries, **kwargs)
+        found = self._probe({key: key}, {key: _entry_names(series_entries)}, revisions)
+        if key in found:
+            return found[key]
+
+        result = self.client.get_unified_series(*series_entries, raise_error=False, **kwargs)
+        # per series, UnifiedSeriesList.is_error is true for any non-empty list in macrobond_data_api 3.0
+        errors = ['%s: %s' % (s.name, s.error_message) for s in result if s.is_error]
+        if errors:
+            raise FetchError('; '.join(errors))
+        stamps = [revision_stamp(s.metadata or {}) for s in result]
+        value = result.to_pd_data_frame()
+        with self._lock:
+            self._write(key, value, None if None in stamps else ';'.join(stamps), time.time())
+            self._save_index()
+        return value
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            for key in list(self._index):
+                self._evict(key)
+            self._save_index()
+
+    ############ internals ############
+
+    def _probe(self, keys, names, revisions=None):
+        # keys maps a caller id to its cache key, names maps the same id to the
+        # series the entry depends on; returns {id: value} for every usable entry
+        with self._lock:
+            return self._probe_locked(keys, names, revisions or {})
+
+    def _probe_locked(self, keys, names, revisions):
+        now = time.time()
+        found, stale = {}, {}
+        for ident, key in keys.items():
+            entry = self._index.get(key)
+            stamps = [revisions.get(n) for n in names[ident]]
+            if entry is not None and entry.get('revision') is not None and None not in stamps \
+                    and entry['revision'] != ';'.join(stamps):
+                entry = None  # stored from an earlier revision than the caller knows of
+            value = self._read(key) if entry is not None else None
+            if value is None:
+                self._evict(key)
+            elif now - entry['stored'] < self.ttl:
+                found[ident] = self._touch(key, now, value)
+            else:
+                stale[ident] = value
+
+        if stale:
+            # stale entries are only downloaded again when the series actually changed,
+            # all of them are checked with a single metadata request
+            current = self._current_revisions({n for ident in stale for n in names[ident]})
+            for ident, value in stale.items():
+                key = keys[ident]
+                revision = self._index[key].get('revision')
+                stamps = [current.get(n) for n in names[ident]]
+                if revision is not None and None not in stamps and revision == ';'.join(stamps):
+                    self._index[key]['stored'] = now
+                    found[ident] = self._touch(key, now, value)
+                else:
+                    self._evict(key)
+        if found or stale:
+            self._save_index()
+        tracer = get_tracer()
+        tracer.count('cache_hits', len(found), cache='series')
+        tracer.count('cache_misses', len(keys) - len(found), cache='series')
+        return found
+
+    def _current_revisions(self, names):
+        if self.metadata is not None:
+            return {n: revision_stamp(m) for n, m in self.metadata.resolve(sorted(names)).items()}
+        entities = self.client.get_entities(sorted(names), raise_error=False)
+        return {e.name: revision_stamp(e.metadata) for e in entities if not e.is_error}
+
+    def _touch(self, key, now, value):
+        self._index[key]['accessed'] = now
+        return value
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def _read(self, key):
+        return read_pickle(self._path(key))
+
+    def _write(self, key, value, revision, now):
+        path = self._path(key)
+        write_pickle(path, value)
+        self._index[key] = {
+            'stored': now,
+            'accessed': now,
+            'revision': revision,
+            'size': os.path.getsize(path),
+        }
+        self._enforce_size()
+
+    def _evict(self, key):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _enforce_size(self):
+        total = sum(e['size'] for e in self._index.values())
+        # least recently used entries go first
+        for key, entry in sorted(self._index.items(), key=lambda kv: kv[1]['accessed']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['size']
+            self._evict(key)
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        with atomic_write(os.path.join(self.directory, INDEX_FILE)) as f:
+            json.dump(self._index, f)
@@ -0,0 +1,232 @@
+"""Command line entry point, ``brazil-dash`` (or ``python -m brazil_dash``).
+
+Builds some or all dashboard sections without running the notebook::
+
+    brazil-dash --sections inflation,current_account --out charts/
+    brazil-dash --list
+    brazil-dash --sections inflation --dry-run
+    brazil-dash --serve 8050
+
+Start-up is kept short for event hooks triggered by data releases: only
+this module and the standard library are imported up front, pandas,
+matplotlib and the Macrobond client are loaded by the stages that use
+them.  ``--list`` and ``--dry-run`` load none of them and never touch the
+network; the dry run plans with the metadata cached by earlier runs.
+``--serve`` runs the HTTP service of ``brazil_dash.server`` instead of
+writing files.
+"""
+
+import argparse
+import os
+import sys
+
+DEFAULT_OUT = 'charts'
+OFFLINE_CACHE = 'offline'  # subdirectory of the cache used with --offline
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='brazil-dash', description='Build the Macrobond emerging market dashboard.')
+    parser.add_argument('--sections', help='comma separated section names (default: all)')
+    parser.add_argument('--country', default='br', help='Macrobond country prefix (default: br)')
+    parser.add_argument('--out', default=DEFAULT_OUT, help='output directory (default: %s)' % DEFAULT_OUT)
+    parser.add_argument('--formats', default='png', help='comma separated chart formats: png, svg, pdf')
+    parser.add_argument('--pdf', help='also write all selected charts into this PDF inside the output directory')
+    parser.add_argument('--list', action='store_true', help='list the sections and their series and exit')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='show what would be rebuilt and fetched, without touching the network')
+    parser.add_argument('--force', action='store_true', help='rebuild even unchanged sections')
+    parser.add_argument('--offline', action='store_true', help='use synthetic data instead of Macrobond')
+    parser.add_argument('--cache', help='cache directory (default: $BRAZIL_DASH_CACHE or ~/.cache/brazil_dash)')
+    parser.add_argument('--no-store', action='store_true',
+                        help='fetch plain series without the columnar store (used when pyarrow is installed)')
+    parser.add_argument('--workers', type=int, help='render processes (default: one per CPU)')
+    parser.add_argument('--trace', metavar='DIR', help='write a JSON trace and Prometheus metrics of the run to DIR')
+    parser.add_argument('--serve', metavar='[HOST:]PORT', help='serve the charts and their data over HTTP')
+    parser.add_argument('--points', type=int, help='with --serve, observations drawn per line (0: all)')
+    parser.add_argument('--refresh', type=int,
+                        help='with --serve, seconds between checks for new revisions (default 900)')
+    return parser
+
+
+def _sections(parser, args):
+    from .countries import COUNTRIES
+    from .sections import country_sections
+
+    sections = country_sections(COUNTRIES.get(args.country, args.country.upper()), args.country)
+    if not args.sections:
+        return sections
+    by_name = {s.name: s for s in sections}
+    names = [n.strip() for n in args.sections.split(',') if n.strip()]
+    unknown = [n for n in names if n not in by_name]
+    if unknown:
+        parser.error('unknown sections: %s (available: %s)' % (', '.join(unknown), ', '.join(by_name)))
+    return [by_name[n] for n in dict.fromkeys(names)]
+
+
+def _cache_dir(args):
+    from .cache import DEFAULT_CACHE_DIR
+
+    directory = args.cache or DEFAULT_CACHE_DIR
+    return os.path.join(directory, OFFLINE_CACHE) if args.offline else directory
+
+
+def list_sections(sections, out=sys.stdout):
+    width = max(len(s.name) for s in sections)
+    for section in sections:
+        out.write('%-*s  %-45s  %s\n' % (width, section.name, section.title, ', '.join(section.codes)))
+
+
+def dry_run(sections, cache_dir, out_dir, formats, force=False, out=sys.stdout):
+    """Print what a run would rebuild and which requests it would send, using only cached metadata."""
+    from .build import BuildManifest, stale_sections
+    from .metadata import MetadataResolver
+    from .planner import FetchPlan
+
+    resolver = MetadataResolver(cache_dir, offline=True)
+    try:
+        metadata = resolver.resolve([code for s in sections for code in s.codes])
+    except LookupError as exc:
+        out.write('%s\nno rebuild check; frequencies, conversions and local alignment are decided on the first run\n'
+                  % exc)
+        metadata, resolver = None, None
+    plan = FetchPlan(sections, resolver=resolver)
+
+    if metadata is not None:
+        stale = stale_sections(sections, metadata, BuildManifest(out_dir), formats, force)
+        for section in sections:
+            out.write('%-20s %s\n' % (section.name, 'rebuild' if section in stale else 'up to date'))
+        sections = stale
+        plan = FetchPlan(sections, resolver=resolver) if sections else None
+    if plan is None:
+        out.write('nothing to fetch\n')
+        return plan
+    out.write(plan.summary() + '\n')
+    if plan.series:
+        out.write('  get_many_series: %s\n' % ', '.join(plan.series))
+    for group in plan.groups:
+        out.write('  get_unified_series (%s, %s): %s\n' % (
+            group.currency, group.frequency or 'highest frequency', ', '.join(i.code for i in group.inputs)))
+    for name in plan.local:
+        out.write('  aligned locally: %s (%s)\n' % (name, plan.frequencies[name]))
+    for name, code, method in plan.conversions():
+        out.write('  %s: converting %s to a higher frequency using %s\n' % (name, code, method))
+    return plan
+
+
+def _backend(args, metadata_ttl=None, cache_ttl=None):
+    # (fetcher, metadata resolver, series cache, store) as configured by the options
+    from .cache import DEFAULT_TTL, SeriesCache
+    from .fetch import ConcurrentFetcher
+    from .metadata import DEFAULT_METADATA_TTL, MetadataResolver
+    from .trace import TracedClient
+
+    cache_dir = _cache_dir(args)
+    fetcher = ConcurrentFetcher()
+    if args.offline:
+        from .mock import MockMacrobond
+
+        api = MockMacrobond()
+    else:
+        from .cache import default_client
+
+        api = default_client()
+    client = fetcher.wrap(TracedClient(api) if args.trace else api)
+    metadata = MetadataResolver(cache_dir, client=client,
+                                ttl=DEFAULT_METADATA_TTL if metadata_ttl is None else metadata_ttl)
+    cache = SeriesCache(cache_dir, client=client, metadata=metadata,
+                        ttl=DEFAULT_TTL if cache_ttl is None else cache_ttl)
+    store = None
+    if not args.no_store:
+        from .store import SeriesStore, available
+
+        if available():  # pyarrow is optional, the series cache serves everything without it
+            store = SeriesStore(os.path.join(cache_dir, 'store'), client=client, resolver=metadata)
+    return fetcher, metadata, cache, store
+
+
+def _finish(args, tracer, fetcher):
+    fetcher.close()
+    if args.trace:
+        for key, value in fetcher.stats.items():
+            tracer.count('fetcher_' + key, value)
+        tracer.write_json(os.path.join(args.trace, 'trace.json'))
+        tracer.write_prometheus(os.path.join(args.trace, 'brazil_dash.prom'))
+
+
+def build(sections, args):
+    """Fetch, transform and render ``sections`` as the notebook does; returns the BuildResult."""
+    from .build import incremental_build
+    from .derived import DerivedStore
+    from .trace import Tracer, set_tracer
+
+    tracer = set_tracer(Tracer() if args.trace else None)
+    fetcher, metadata, cache, store = _backend(args)
+    derived = DerivedStore(os.path.join(_cache_dir(args), 'derived'))
+    try:
+        result = incremental_build(sections, cache, metadata, args.out, formats=args.formats, pdf=args.pdf,
+                                   workers=args.workers, force=args.force, fetcher=fetcher, store=store,
+                                   derived=derived)
+    finally:
+        _finish(args, tracer, fetcher)
+    return result
+
+
+def serve(sections, args):
+    """Serve ``sections`` over HTTP until interrupted (``--serve``)."""
+    from .derived import DerivedStore
+    from .metadata import DEFAULT_METADATA_TTL
+    from .server import DEFAULT_POINTS, Dashboard, serve
+    from .trace import Tracer, set_tracer
+
+    host, _, port = args.serve.rpartition(':')
+    tracer = set_tracer(Tracer() if args.trace else None)
+    # revisions are checked every --refresh seconds and the fetch plan hands them to the series cache, so a new
+    # revision is never answered with data downloaded before it; series without revision stamps are downloaded
+    # again at most every --refresh seconds
+    refresh = DEFAULT_METADATA_TTL if args.refresh is None else args.refresh
+    fetcher, metadata, cache, store = _backend(args, metadata_ttl=refresh, cache_ttl=refresh)
+    dashboard = Dashboard(sections, cache, metadata, fetcher=fetcher, store=store,
+                          derived=DerivedStore(os.path.join(_cache_dir(args), 'derived')),
+                          points=DEFAULT_POINTS if args.points is None else args.points, refresh=refresh)
+    try:
+        serve(dashboard, host or '127.0.0.1', int(port))
+    finally:
+        _finish(args, tracer, fetcher)
+
+
+def main(argv=None):
+    from .render import FORMATS  # the standard library only, matplotlib is imported when drawing
+
+    parser = _parser()
+    args = parser.parse_args(argv)
+    formats = tuple(f.strip() for f in args.formats.split(',') if f.strip())
+    if not formats or set(formats) - set(FORMATS):
+        parser.error('--formats takes a comma separated list of %s, not %r' % (', '.join(FORMATS), args.formats))
+    args.formats = formats
+    sections = _sections(parser, args)
+
+    if args.list:
+        list_sections(sections)
+        return 0
+    if args.dry_run:
+        dry_run(sections, _cache_dir(args), args.out, args.formats, args.force)
+        return 0
+    if args.serve:
+        if not args.serve.rpartition(':')[2].isdigit():
+            parser.error('--serve takes a port or host:port, not %r' % args.serve)
+        serve(sections, args)
+        return 0
+
+    result = build(sections, args)
+    if result.plan is not None:
+        print(result.plan.summary())
+    print(result.summary())
+    for name in result.built:
+        print('  %s' % ', '.join(result.artifacts[name]))
+    if result.pdf:
+        print('  %s' % result.pdf)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
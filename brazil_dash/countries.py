@@ -0,0 +1,217 @@
+"""The dashboard for many countries at once.
+
+``country_sections`` turns the Brazil dashboard into a template over the
+Macrobond country prefix.  ``run_countries`` builds it for every country in
+a mapping such as ``COUNTRIES`` and writes one report per country, each in
+its own directory (``<out_dir>/<prefix>``) with its charts, build manifest
+and PDF report.
+
+The network bound part is shared: the metadata of every series of every
+country is resolved in one batch and the data of all countries that need
+rebuilding is fetched with one plan (one bulk request for the plain
+series) through the usual cache, store and fetcher.  The CPU bound part,
+transforming and rendering, is fanned out over a process pool, one country
+per task.  Countries whose charts are all current are not fetched or
+rendered at all.
+"""
+
+import os
+import time
+
+from .build import BuildManifest, build_sections, stale_sections
+from .fetch import NO_RETRY_NAMES
+from .planner import FetchPlan
+from .sections import Section, country_sections
+from .trace import Tracer, get_tracer, set_tracer
+
+REPORT = 'report.pdf'
+
+# Macrobond country prefix -> country name
+COUNTRIES = {
+    'ae': 'United Arab Emirates',
+    'ar': 'Argentina',
+    'bd': 'Bangladesh',
+    'bg': 'Bulgaria',
+    'br': 'Brazil',
+    'cl': 'Chile',
+    'cn': 'China',
+    'co': 'Colombia',
+    'cz': 'Czech Republic',
+    'do': 'Dominican Republic',
+    'ec': 'Ecuador',
+    'eg': 'Egypt',
+    'gh': 'Ghana',
+    'hu': 'Hungary',
+    'id': 'Indonesia',
+    'in': 'India',
+    'jo': 'Jordan',
+    'ke': 'Kenya',
+    'kr': 'South Korea',
+    'kw': 'Kuwait',
+    'kz': 'Kazakhstan',
+    'lk': 'Sri Lanka',
+    'ma': 'Morocco',
+    'mx': 'Mexico',
+    'my': 'Malaysia',
+    'ng': 'Nigeria',
+    'pe': 'Peru',
+    'ph': 'Philippines',
+    'pk': 'Pakistan',
+    'pl': 'Poland',
+    'qa': 'Qatar',
+    'ro': 'Romania',
+    'rs': 'Serbia',
+    'sa': 'Saudi Arabia',
+    'th': 'Thailand',
+    'tr': 'Turkey',
+    'tw': 'Taiwan',
+    'ua': 'Ukraine',
+    'uy': 'Uruguay',
+    'vn': 'Vietnam',
+    'za': 'South Africa',
+}
+
+
+class RunResult:
+    """Outcome of ``run_countries``."""
+
+    def __init__(self):
+        self.reports = {}  # prefix -> BuildResult
+        self.failed = {}  # prefix -> error message
+        self.plan = None  # the combined FetchPlan, None when nothing had to be fetched
+
+    def summary(self):
+        built = sum(1 for r in self.reports.values() if r.built)
+        return '%d countries: %d rebuilt, %d unchanged, %d failed' % (
+            len(self.reports) + len(self.failed), built, len(self.reports) - built, len(self.failed))
+
+
+def _qualified(prefix, section):
+    # a copy named uniquely across countries, for the combined fetch plan
+    return Section('%s/%s' % (prefix, section.name), section.inputs, section.transforms, section.chart,
+                   section.currency)
+
+
+def _country_report(country, prefix, codes, metadata, raw, out_dir, formats, pdf, force, derived, trace=False):
+    # runs in a worker process: transforms and renders one country from the data fetched by the parent;
+    # with ``trace`` its spans and counters are collected here and returned for the parent's tracer
+    started = time.perf_counter()
+    sections = country_sections(country, prefix, codes)
+    tracer = set_tracer(Tracer()) if trace else None
+
+    def load(subset):
+        return None, {s.name: raw[s.name] for s in subset}
+
+    try:
+        result = build_sections(sections, metadata, load, out_dir, formats, pdf, workers=1, force=force,
+                                derived=derived)
+    finally:
+        if trace:
+            set_tracer(None)
+    return result, time.perf_counter() - started, tracer.to_dict() if trace else None
+
+
+def _missing(exc):
+    # series Macrobond does not know: LookupError from the resolver, or the client's own GetEntitiesError
+    return isinstance(exc, LookupError) or type(exc).__name__ in NO_RETRY_NAMES
+
+
+def _resolve(resolver, sections):
+    # {prefix: metadata} for the countries whose series all exist, {prefix: error} for the others;
+    # one batch for everything, per country only to find the culprits when the batch fails
+    try:
+        metadata = resolver.resolve([code for secs in sections.values() for s in secs for code in s.codes])
+    except Exception as exc:
+        if not _missing(exc):
+            raise
+    else:
+        return {prefix: {code: metadata[code] for s in secs for code in s.codes}
+                for prefix, secs in sections.items()}, {}
+    resolved, failed = {}, {}
+    for prefix, secs in sections.items():
+        try:
+            resolved[prefix] = resolver.resolve([code for s in secs for code in s.codes])
+        except Exception as exc:
+            if not _missing(exc):
+                raise
+            failed[prefix] = str(exc)
+    return resolved, failed
+
+
+def run_countries(cache, resolver, out_dir, countries=None, codes=None, formats=('png',), pdf=REPORT, workers=None,
+                  force=False, fetcher=None, store=None, derived=None):
+    """Build the dashboard of every country in ``countries`` (prefix -> name, ``COUNTRIES`` by default).
+
+    ``codes`` maps prefixes to ``country_sections`` overrides for countries
+    with differently numbered series.  Reports are spread over ``workers``
+    processes (one per CPU by default).  Countries with missing series are
+    reported in ``RunResult.failed`` and do not stop the others.  ``derived``
+    (a ``DerivedStore``) updates the transformed frames incrementally.
+    """
+    tracer = get_tracer()
+    countries = dict(COUNTRIES if countries is None else countries)
+    codes = codes or {}
+    result = RunResult()
+    sections = {prefix: country_sections(name, prefix, codes.get(prefix)) for prefix, name in countries.items()}
+
+    with tracer.span('metadata', countries=len(countries)):
+        metadata, result.failed = _resolve(resolver, {p: sections[p] for p in countries})
+
+    todo = []
+    for prefix in metadata:
+        directory = os.path.join(out_dir, prefix)
+        stale = stale_sections(sections[prefix], metadata[prefix], BuildManifest(directory), formats, force)
+        if stale or (pdf is not None and not os.path.exists(os.path.join(directory, pdf))):
+            todo.append(prefix)
+        else:
+            result.reports[prefix] = None  # filled in below, without fetching anything
+
+    raw = {}
+    if todo:
+        # every section of the countries to rebuild: their PDF report needs the unchanged charts too
+        qualified = [_qualified(prefix, s) for prefix in todo for s in sections[prefix]]
+        with tracer.span('plan', sections=len(qualified)):
+            result.plan = FetchPlan(qualified, resolver=resolver)
+        with tracer.span('fetch', requests=result.plan.requests):
+            downloaded = result.plan.download(cache, fetcher, store)
+        with tracer.span('align', sections=len(result.plan.local)):
+            frames = result.plan.assemble(downloaded)
+        for prefix in todo:
+            raw[prefix] = {s.name: frames['%s/%s' % (prefix, s.name)] for s in sections[prefix]}
+
+    def task(prefix, trace=False):
+        data = raw.get(prefix, {})
+        return (countries[prefix], prefix, codes.get(prefix), metadata[prefix], data, os.path.join(out_dir, prefix),
+                formats, pdf, force, derived, trace)
+
+    workers = min(workers or os.cpu_count() or 1, len(todo)) or 1
+    with tracer.span('reports', countries=len(todo), workers=workers):
+        if workers == 1:
+            outcomes = {prefix: _attempt(_country_report, *task(prefix)) for prefix in metadata}
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {prefix: pool.submit(_country_report, *task(prefix, tracer.enabled)) for prefix in todo}
+                outcomes = {prefix: _attempt(future.result) for prefix, future in futures.items()}
+            # unchanged countries only have their manifest read, no need for a process
+            outcomes.update({p: _attempt(_country_report, *task(p)) for p in metadata if p not in todo})
+    for prefix, (report, error) in outcomes.items():
+        if error is not None:
+            result.reports.pop(prefix, None)
+            result.failed[prefix] = error
+            continue
+        report, seconds, trace = report
+        if trace is not None:
+            tracer.merge(trace)  # the worker's transform and render spans, derived rows, ...
+        result.reports[prefix] = report
+        tracer.record('report', seconds, country=prefix)
+    return result
+
+
+def _attempt(fn, *args):
+    # (result, None) or (None, error message); one country failing does not stop the others
+    try:
+        return fn(*args), None
+    except Exception as exc:
+        return None, '%s: %s' % (type(exc).__name__, exc)
@@ -0,0 +1,73 @@
+"""Derived indicators kept up to date incrementally.
+
+The sections' growth rates, GDP ratios and differences used to be computed
+over the full history on every run, even when a single observation had
+been added.  ``DerivedStore`` keeps each section's transformed frame on
+disk together with the input frame it was computed from.  On the next run
+the new inputs are compared with the stored ones, and only the rows from
+the first appended or revised observation on are recomputed
+(``Pipeline.update``, which reaches back as far as the steps need).  The
+result is identical to a full recompute, and unchanged inputs cost a
+comparison only.
+"""
+
+import os
+
+from .cache import DEFAULT_CACHE_DIR, request_key
+from .files import read_pickle, write_pickle
+from .trace import get_tracer
+
+
+def first_change(old, new):
+    """Position of the first row where ``new`` differs from ``old`` (dates or values), None if they are equal."""
+    import numpy as np
+
+    if list(old.columns) != list(new.columns):
+        return 0
+    n = min(len(old), len(new))
+    a = old.to_numpy(dtype='float64')[:n]
+    b = new.to_numpy(dtype='float64')[:n]
+    differs = np.asarray(old.index[:n] != new.index[:n])
+    differs |= ((a != b) & ~(np.isnan(a) & np.isnan(b))).any(axis=1)
+    if differs.any():
+        return int(differs.argmax())
+    return None if len(old) == len(new) else n
+
+
+class DerivedStore:
+    """Transformed section frames stored next to the inputs they were computed from."""
+
+    def __init__(self, directory=os.path.join(DEFAULT_CACHE_DIR, 'derived')):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(section):
+        # the series and the pipeline, so a changed declaration starts from scratch
+        return request_key('derived', section.codes, [i.column for i in section.inputs], section.transforms)
+
+    def transform(self, section, frame):
+        """``section.transform(frame)``, recomputing only the rows affected since the stored run."""
+        tracer = get_tracer()
+        key = self.key(section)
+        stored = read_pickle(self._path(key))
+        changed = None if stored is None else first_change(stored[0], frame)
+        if stored is None:
+            result = section.transform(frame)
+            tracer.count('derived_rows', len(frame), mode='full')
+        elif changed is None:
+            tracer.count('derived_rows', 0, mode='reused')
+            return stored[1]
+        else:
+            result = section.transforms.update(frame, stored[1], changed)
+            tracer.count('derived_rows', len(frame) - changed, mode='incremental')
+        write_pickle(self._path(key), (frame, result))
+        return result
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.directory, name))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
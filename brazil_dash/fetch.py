@@ -0,0 +1,187 @@
+"""Concurrent, rate limited and retried Macrobond requests.
+
+``ConcurrentFetcher.wrap(client)`` returns a stand-in for the Macrobond
+client whose every call runs on a worker thread, with a bounded number of
+them running at a time.  Each call first
+takes a token from a token bucket (rate limit), gets ``timeout`` seconds
+of running time per attempt, and is retried with exponential backoff and
+jitter.
+``gather`` runs independent tasks (e.g. the bulk requests of a fetch plan)
+at the same time, so a run takes about as long as its slowest request
+instead of the sum of all of them.
+
+Anything with the ``macrobond_data_api`` function names can be wrapped,
+which keeps the layer testable against a local fake client.
+"""
+
+import inspect
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from .cache import FetchError, default_client
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_RATE = 10.0  # requests per second
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5  # seconds before the first retry, doubled for each further one
+DEFAULT_MAX_BACKOFF = 30.0
+DEFAULT_TIMEOUT = 60.0  # seconds per attempt
+
+# errors of macrobond_data_api that no retry can fix, matched by name so the client is not imported up front
+NO_RETRY_NAMES = ('GetEntitiesError',)
+
+
+class FetchTimeout(TimeoutError):
+    """A request attempt did not finish within the per-request timeout."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing ``rate`` acquisitions per second with bursts of ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class ConcurrentFetcher:
+    """Runs client calls concurrently with a concurrency cap, rate limit, retries and timeouts.
+
+    Errors in ``no_retry`` (series Macrobond reported as missing, ...) and
+    the client's ``GetEntitiesError`` are raised straight away; other
+    exceptions are retried ``retries`` times.
+    At most ``max_workers`` attempts run at a time and ``timeout`` starts
+    when an attempt starts running, so calls waiting for a free worker
+    never time out.  A timed out attempt is abandoned: its worker is
+    replaced straight away, and its daemon thread ends whenever the
+    underlying call returns.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, rate=DEFAULT_RATE, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF, timeout=DEFAULT_TIMEOUT,
+                 no_retry=(FetchError, LookupError), sleep=time.sleep):
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate) if rate else None
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.no_retry = tuple(no_retry)
+        self.stats = {'calls': 0, 'attempts': 0, 'retries': 0, 'timeouts': 0, 'failures': 0}
+        self._sleep = sleep
+        # attempts running and not abandoned yet; every slot frees up within ``timeout``
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def call(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on a worker thread under the rate limit, timeout and retry policy."""
+        self._count('calls')
+        for attempt in range(self.retries + 1):
+            if self.bucket is not None:
+                self.bucket.acquire()
+            self._count('attempts')
+            self._slots.acquire()
+            try:
+                return _start(fn, args, kwargs).result(timeout=self.timeout)
+            except FutureTimeout:
+                self._count('timeouts')
+                error = FetchTimeout('%s did not finish within %ss' % (getattr(fn, '__name__', fn), self.timeout))
+            except self.no_retry:
+                self._count('failures')
+                raise
+            except Exception as exc:  # anything else (connection resets, HTTP 5xx, ...) is worth another try
+                if type(exc).__name__ in NO_RETRY_NAMES:
+                    self._count('failures')
+                    raise
+                error = exc
+            finally:
+                self._slots.release()
+            if attempt < self.retries:
+                self._count('retries')
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                self._sleep(delay * (0.5 + random.random() / 2))
+        self._count('failures')
+        raise error
+
+    def gather(self, tasks):
+        """Run ``{key: callable}`` concurrently and return ``{key: result}``; the first error is raised."""
+        if len(tasks) <= 1:
+            return {key: task() for key, task in tasks.items()}
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix='gather') as pool:
+            futures = {key: pool.submit(task) for key, task in tasks.items()}
+            return {key: future.result() for key, future in futures.items()}
+
+    def wrap(self, client=None):
+        """Return a client whose calls all go through ``call``; ``client`` defaults to macrobond_data_api."""
+        return GuardedClient(self, client)
+
+    def close(self):
+        # attempts run on daemon threads, abandoned ones do not keep the interpreter from exiting
+        pass
+
+
+def _start(fn, args, kwargs):
+    # runs one attempt on its own daemon thread, so an abandoned attempt never blocks the next one
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(_materialize(fn, args, kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name='fetch', daemon=True).start()
+    return future
+
+
+def _materialize(fn, args, kwargs):
+    # generators (get_many_series) have to be consumed inside the attempt,
+    # otherwise the download would escape the timeout and retries
+    result = fn(*args, **kwargs)
+    if inspect.isgenerator(result):
+        result = list(result)
+    return result
+
+
+class GuardedClient:
+    """Client proxy routing every function call through a ``ConcurrentFetcher``."""
+
+    def __init__(self, fetcher, client=None):
+        self._fetcher = fetcher
+        self._client = client
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._client is None:
+            self._client = default_client()
+        attr = getattr(self._client, name)
+        if not callable(attr) or inspect.isclass(attr):
+            return attr
+
+        def guarded(*args, **kwargs):
+            return self._fetcher.call(attr, *args, **kwargs)
+
+        guarded.__name__ = name
+        return guarded
@@ -0,0 +1,39 @@
+"""Atomic writes for the cache, metadata, store, manifest and trace files.
+
+Every file the package keeps is first written next to its destination and
+then moved over it with ``os.replace``, so readers (and memory maps of the
+previous version) never see a half-written file, and an interrupted run
+leaves the old one in place.
+"""
+
+import contextlib
+import os
+import pickle
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w'):
+    """Open a temporary file for writing that replaces ``path`` when the block succeeds."""
+    tmp = path + '.tmp'
+    try:
+        with open(tmp, mode) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+def read_pickle(path, default=None):
+    """Load a pickle written by ``write_pickle``, ``default`` if it is missing or unreadable."""
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return default
+
+
+def write_pickle(path, value):
+    with atomic_write(path, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
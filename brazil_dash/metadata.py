@@ -0,0 +1,116 @@
+"""Batched, cached resolution of series metadata and frequencies.
+
+The notebook used to print ``get_one_entity(...).metadata_to_pd_series()['Frequency']``
+for every input of every ratio cell so a human could decide whether the
+series had to be converted.  The resolver instead fetches the entities of
+all referenced series in one ``get_entities`` call, keeps them on disk for
+``ttl`` seconds and picks the conversion method programmatically.
+"""
+
+import os
+import threading
+import time
+
+from .cache import DEFAULT_CACHE_DIR, default_client
+from .files import read_pickle, write_pickle
+from .trace import get_tracer
+
+DEFAULT_METADATA_TTL = 15 * 60  # short enough for the revision stamps to stay useful
+
+METADATA_FILE = 'metadata.pkl'
+
+# Macrobond 'Frequency' attribute values, lowest to highest
+FREQUENCIES = ['annual', 'semiannual', 'quadmonthly', 'quarterly', 'bimonthly', 'monthly', 'weekly', 'daily']
+
+# used for inputs that have to be converted up and do not declare a method themselves
+DEFAULT_TO_HIGHER_FREQUENCY = 'linear_interpolation'
+
+
+def frequency_rank(frequency):
+    """Position of ``frequency`` in FREQUENCIES, higher is more frequent."""
+    try:
+        return FREQUENCIES.index(str(frequency).lower())
+    except ValueError:
+        raise ValueError('unknown series frequency %r' % frequency) from None
+
+
+class MetadataResolver:
+    """Looks up entity metadata in bulk and caches it with an expiry.
+
+    An ``offline`` resolver never calls the client: expired entries are
+    served as they are and names that were never fetched raise LookupError.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=DEFAULT_METADATA_TTL, client=None, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.offline = offline
+        self._client = client
+        self._lock = threading.Lock()  # concurrent callers wait for one batch instead of sending their own
+        os.makedirs(directory, exist_ok=True)
+        self._entries = self._load()  # name -> (fetched at, metadata dict)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = default_client()
+        return self._client
+
+    def resolve(self, names):
+        """Return ``{name: metadata}``, fetching every missing or expired name in one call."""
+        names = list(dict.fromkeys(names))
+        with self._lock:
+            now = time.time()
+            expired = [n for n in names if n not in self._entries or now - self._entries[n][0] >= self.ttl]
+            tracer = get_tracer()
+            tracer.count('cache_hits', len(names) - len(expired), cache='metadata')
+            tracer.count('cache_misses', len(expired), cache='metadata')
+            if expired and self.offline:
+                unknown = [n for n in expired if n not in self._entries]
+                if unknown:
+                    raise LookupError('not in the metadata cache: %s' % ', '.join(unknown))
+            elif expired:
+                # errors come back as entities, the default would raise the client's GetEntitiesError instead
+                entities = self.client.get_entities(expired, raise_error=False)
+                errors = ['%s: %s' % (e.name, e.error_message) for e in entities if e.is_error]
+                if errors:
+                    raise LookupError('; '.join(errors))
+                for entity in entities:
+                    self._entries[entity.name] = (now, dict(entity.metadata))
+                self._save()
+            return {n: self._entries[n][1] for n in names}
+
+    def frequency(self, name):
+        """The natural frequency of a series, e.g. ``'monthly'``."""
+        return str(self.resolve([name])[name]['Frequency']).lower()
+
+    def align(self, inputs):
+        """Pick a common frequency for ``inputs``.
+
+        Returns ``(frequency, inputs)`` where the lower frequency inputs are
+        copies carrying a ``to_higher_frequency`` method, so all of them end up
+        at the highest natural frequency among the inputs.
+        """
+        metadata = self.resolve([i.code for i in inputs])
+        frequencies = {i.code: str(metadata[i.code]['Frequency']).lower() for i in inputs}
+        target = max(frequencies.values(), key=frequency_rank)
+        aligned = []
+        for inp in inputs:
+            if frequencies[inp.code] != target and not inp.to_higher_frequency:
+                inp = type(inp)(inp.column, inp.code, to_higher_frequency=DEFAULT_TO_HIGHER_FREQUENCY)
+            aligned.append(inp)
+        return target, aligned
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+    def _path(self):
+        return os.path.join(self.directory, METADATA_FILE)
+
+    def _load(self):
+        return read_pickle(self._path(), {})
+
+    def _save(self):
+        write_pickle(self._path(), self._entries)
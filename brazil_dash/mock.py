@@ -0,0 +1,566 @@
+"""Offline stand-in for the parts of ``macrobond_data_api`` the dashboard uses.
+
+``MockMacrobond`` serves synthetic or recorded series through the same
+functions as the real client (``get_one_series``, ``get_many_series``,
+``get_one_entity``, ``get_entities``, ``get_unified_series``).  It also
+carries look-alikes of ``SeriesEntry``, ``StartOrEndPoint`` and the request
+enums, so the whole pipeline runs without Macrobond installed::
+
+    client = MockMacrobond(latency=0.2, jitter=0.1, failure_rate=0.05)
+    cache = SeriesCache(client=client)
+
+Every call sleeps for ``latency`` seconds, plus up to ``jitter`` more, and
+fails with ``MockConnectionError`` with probability ``failure_rate``.  Both
+are drawn from a seeded generator, so benchmark runs are reproducible.
+Missing series behave as on the real client: ``get_entities``,
+``get_series`` and ``get_unified_series`` raise ``GetEntitiesError``
+unless called with ``raise_error=False`` (or ``raise_error`` is set to
+False on the mock), and error entries keep their request positions.
+``install()`` registers the mock as the ``macrobond_data_api`` module, so
+unchanged notebook code (``import macrobond_data_api as mda``) runs offline
+as well.
+"""
+
+import datetime
+import enum
+import json
+import random
+import sys
+import threading
+import time
+import types
+import zlib
+
+from .align import MONTHS, calendar, convert, period_start
+from .metadata import FREQUENCIES
+
+############ look-alikes of the macrobond_data_api request types ############
+
+class SeriesFrequency(enum.IntEnum):
+    ANNUAL = 1
+    SEMIANNUAL = 2
+    QUADMONTHLY = 3
+    QUARTERLY = 4
+    BIMONTHLY = 5
+    MONTHLY = 6
+    WEEKLY = 7
+    DAILY = 8
+    LOWEST = 100
+    HIGHEST = 101
+
+
+class CalendarMergeMode(enum.IntEnum):
+    FULL_CALENDAR = 0
+    AVAILABLE_IN_ALL = 1
+    AVAILABLE_IN_ANY = 2
+
+
+class CalendarDateMode(enum.IntEnum):
+    DATA_IN_ANY_SERIES = 0
+    DATA_IN_ALL_SERIES = 1
+
+
+class SeriesMissingValueMethod(enum.IntEnum):
+    NONE = 0
+    AUTO = 1
+    PREVIOUS_VALUE = 2
+    ZERO_VALUE = 3
+    LINEAR_INTERPOLATION = 4
+
+
+class SeriesToHigherFrequencyMethod(enum.IntEnum):
+    AUTO = 0
+    SAME = 1
+    DISTRIBUTE = 2
+    PERCENTAGE_CHANGE = 3
+    LINEAR_INTERPOLATION = 4
+    PULSE = 5
+    QUADRATIC_DISTRIBUTION = 6
+    CUBIC_INTERPOLATION = 7
+    CONDITIONAL_PERCENTAGE_CHANGE = 8
+
+
+class SeriesToLowerFrequencyMethod(enum.IntEnum):
+    AUTO = 0
+    LAST = 1
+    FIRST = 2
+    FLOW = 3
+    PERCENTAGE_CHANGE = 4
+    HIGHEST = 5
+    LOWEST = 6
+    AVERAGE = 7
+    CONDITIONAL_PERCENTAGE_CHANGE = 8
+
+
+class SeriesPartialPeriodsMethod(enum.IntEnum):
+    NONE = 0
+    AUTO = 1
+    REPEAT_LAST = 2
+    PERCENTAGE_CHANGE = 3
+    REPEAT_LAST_OVER_ALL = 4
+    LINEAR_INTERPOLATION = 5
+    ANNUAL_GROWTH_RATE = 6
+
+
+class SeriesEntry:
+    __slots__ = (
+        'name',
+        'vintage',
+        'missing_value_method',
+        'to_lower_frequency_method',
+        'to_higher_frequency_method',
+        'partial_periods_method',
+    )
+
+    def __init__(self, name, vintage=None, missing_value_method=SeriesMissingValueMethod.NONE,
+                 to_lower_frequency_method=SeriesToLowerFrequencyMethod.AUTO,
+                 to_higher_frequency_method=SeriesToHigherFrequencyMethod.AUTO,
+                 partial_periods_method=SeriesPartialPeriodsMethod.NONE):
+        self.name = name
+        self.vintage = vintage
+        self.missing_value_method = missing_value_method
+        self.to_lower_frequency_method = to_lower_frequency_method
+        self.to_higher_frequency_method = to_higher_frequency_method
+        self.partial_periods_method = partial_periods_method
+
+
+class StartOrEndPoint:
+    __slots__ = ('time', 'mode')
+
+    def __init__(self, time, mode=None):
+        self.time = time
+        self.mode = CalendarDateMode.DATA_IN_ANY_SERIES if mode is None else mode
+
+    @staticmethod
+    def point_in_time(yyyy_or_datetime, mm=None, dd=None):
+        if isinstance(yyyy_or_datetime, (datetime.date, datetime.datetime)):
+            return StartOrEndPoint(yyyy_or_datetime.strftime('%Y-%m-%d'))
+        time_ = str(yyyy_or_datetime).zfill(4)
+        if mm is not None:
+            time_ += '-' + str(mm).zfill(2)
+            if dd is not None:
+                time_ += '-' + str(dd).zfill(2)
+        return StartOrEndPoint(time_)
+
+    @staticmethod
+    def data_in_any_series():
+        return StartOrEndPoint('', CalendarDateMode.DATA_IN_ANY_SERIES)
+
+    @staticmethod
+    def data_in_all_series():
+        return StartOrEndPoint('', CalendarDateMode.DATA_IN_ALL_SERIES)
+
+
+############ response objects ############
+
+class MockEntity:
+    def __init__(self, name, metadata=None, error_message=''):
+        self.name = name
+        self.metadata = metadata or {}
+        self.error_message = error_message
+
+    @property
+    def is_error(self):
+        return self.error_message != ''
+
+    def metadata_to_pd_series(self, name=None):
+        import pandas as pd
+
+        return pd.Series(
+            list(self.metadata.values()), list(self.metadata.keys()), name=name or self.name, dtype='object'
+        )
+
+
+class MockSeries(MockEntity):
+    def __init__(self, name, metadata=None, dates=(), values=(), error_message=''):
+        super().__init__(name, metadata, error_message)
+        self.dates = list(dates)
+        self.values = list(values)
+
+    def values_to_pd_data_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame({'date': self.dates, 'value': self.values})
+
+
+class MockUnifiedSeries:
+    def __init__(self, name, metadata, values, error_message=''):
+        self.name = name
+        self.metadata = metadata
+        self.values = values
+        self.error_message = error_message
+
+    @property
+    def is_error(self):
+        return self.error_message != ''
+
+
+class MockUnifiedSeriesList:
+    def __init__(self, series, dates):
+        self.series = series
+        self.dates = dates
+
+    def to_pd_data_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame({'date': self.dates, **{
+            'Error: ' + s.error_message if s.is_error else s.name: [None] * len(self.dates) if s.is_error else s.values
+            for s in self.series}})
+
+    def __getitem__(self, key):
+        return self.series[key]
+
+    def __iter__(self):
+        return iter(self.series)
+
+    def __len__(self):
+        return len(self.series)
+
+
+class MockConnectionError(ConnectionError):
+    """Injected network failure."""
+
+
+class GetEntitiesError(Exception):
+    """Look-alike of ``macrobond_data_api.common.types.GetEntitiesError``, raised for missing series."""
+
+    def __init__(self, entities):
+        self.entities = list(entities)  # the error entries, with ``name`` and ``error_message``
+        self.message = 'failed to retrieve:\n' + '\n'.join(
+            '\t%s error_message: %s' % (e.name, e.error_message) for e in self.entities)
+        super().__init__(self.message)
+
+
+def _raise_errors(entries, raise_error):
+    errors = [e for e in entries if e.is_error]
+    if raise_error and errors:
+        raise GetEntitiesError(errors)
+    return entries
+
+
+############ the mock backend ############
+
+# natural frequencies of the dashboard indicators (codes without the country prefix), everything else is monthly
+DEFAULT_FREQUENCIES = {'fofi1043': 'quarterly'}
+DEFAULT_START = '1990-01-01'
+DEFAULT_END = '2024-12-01'
+
+
+def synthetic_series(code, frequency='monthly', start=DEFAULT_START, end=DEFAULT_END, length=None, level=1e11,
+                     volatility=0.01):
+    """Deterministic random walk for ``code`` (same code, same numbers, in every process).
+
+    With ``length`` the series has that many observations up to ``end``
+    and ``start`` is ignored.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if length is None:
+        dates = calendar(frequency, pd.Timestamp(start), pd.Timestamp(end))
+    else:
+        end = period_start(pd.DatetimeIndex([end]), frequency)[0]
+        first = end - _span(frequency, length - 1)
+        dates = calendar(frequency, first, end)[-length:]
+    rng = np.random.default_rng(zlib.crc32(code.encode('utf-8')))
+    values = level * np.exp(np.cumsum(rng.normal(0.002, volatility, len(dates))))
+    return pd.Series(values, index=dates, name=code)
+
+
+class MockMacrobond:
+    """In-memory Macrobond backend with injectable latency and failures.
+
+    ``data`` maps codes to ``(frequency, pandas Series)``; unknown codes are
+    generated on first use with ``synthetic_series`` unless ``strict`` is set,
+    in which case they come back as errors like on the real service.
+    """
+
+    SeriesEntry = SeriesEntry
+    StartOrEndPoint = StartOrEndPoint
+    SeriesFrequency = SeriesFrequency
+    CalendarMergeMode = CalendarMergeMode
+    CalendarDateMode = CalendarDateMode
+    SeriesMissingValueMethod = SeriesMissingValueMethod
+    SeriesToHigherFrequencyMethod = SeriesToHigherFrequencyMethod
+    SeriesToLowerFrequencyMethod = SeriesToLowerFrequencyMethod
+    SeriesPartialPeriodsMethod = SeriesPartialPeriodsMethod
+    GetEntitiesError = GetEntitiesError
+
+    raise_error = True  # default of the raise_error parameters, like ``Api.raise_error``
+
+    def __init__(self, data=None, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, strict=False,
+                 start=DEFAULT_START, end=DEFAULT_END, length=None, currencies=None):
+        self.data = dict(data or {})
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.strict = strict
+        self.start = start
+        self.end = end
+        self.length = length  # number of observations of generated series, overrides ``start``
+        self.currencies = dict(currencies or {})  # code -> 'Currency' metadata, 'usd' by default
+        self.calls = []  # (function name, argument summary), in call order
+        self._revisions = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    ############ dataset ############
+
+    def series(self, code):
+        """``(frequency, pandas Series)`` for ``code``, generating it if needed."""
+        with self._lock:
+            if code not in self.data:
+                if self.strict:
+                    raise KeyError(code)
+                frequency = DEFAULT_FREQUENCIES.get(code[2:], 'monthly')
+                self.data[code] = (frequency, synthetic_series(code, frequency, self.start, self.end, self.length))
+            return self.data[code]
+
+    def metadata(self, code):
+        frequency, values = self.series(code)
+        stamp = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(
+            minutes=self._revisions.get(code, 0))
+        return {
+            'PrimName': code,
+            'Frequency': frequency,
+            'Currency': self.currencies.get(code, 'usd'),
+            'EntityType': 'TimeSeries',
+            'LastModifiedTimeStamp': stamp,
+            'LastRevisionTimeStamp': stamp,
+        }
+
+    def publish(self, code, observations=1, revise=0):
+        """Simulate a data release: append ``observations`` new points and revise the last ``revise`` ones."""
+        import pandas as pd
+
+        frequency, values = self.series(code)
+        values = values.copy()
+        if revise:
+            values.iloc[-revise:] *= 1.001
+        if observations:
+            last = values.index[-1]
+            dates = calendar(frequency, last, last + pd.DateOffset(years=observations + 1))[1:observations + 1]
+            walk = values.iloc[-1] * (1.002 ** pd.Series(range(1, observations + 1), index=dates))
+            values = pd.concat([values, walk])
+        with self._lock:
+            self.data[code] = (frequency, values.rename(code))
+            self._revisions[code] = self._revisions.get(code, 0) + 1
+
+    ############ recordings ############
+
+    def save(self, path, codes=None):
+        """Write the dataset (or ``codes`` of it) as JSON, for replaying it later with ``load``."""
+        payload = {}
+        for code in codes or list(self.data):
+            frequency, values = self.series(code)
+            payload[code] = {
+                'frequency': frequency,
+                'dates': [d.isoformat() for d in values.index],
+                'values': [None if v != v else float(v) for v in values.to_numpy()],
+            }
+        with open(path, 'w') as f:
+            json.dump(payload, f)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """A mock serving the series recorded in ``path`` (see ``save`` and ``record``)."""
+        import pandas as pd
+
+        with open(path) as f:
+            payload = json.load(f)
+        data = {
+            code: (entry['frequency'], pd.Series(
+                [float('nan') if v is None else v for v in entry['values']],
+                index=pd.DatetimeIndex(entry['dates']), name=code,
+            ))
+            for code, entry in payload.items()
+        }
+        return cls(data, **kwargs)
+
+    ############ network simulation ############
+
+    def _network(self, name, detail):
+        with self._lock:
+            self.calls.append((name, detail))
+            delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+            fail = self.failure_rate and self._random.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise MockConnectionError('injected failure in %s' % name)
+
+    def _lookup(self, code):
+        try:
+            return self.series(code)
+        except KeyError:
+            return None
+
+    ############ macrobond_data_api functions ############
+
+    def get_one_entity(self, entity_name, raise_error=None):
+        return self.get_entities([entity_name], raise_error)[0]
+
+    def get_entities(self, entity_names, raise_error=None):
+        self._network('get_entities', tuple(entity_names))
+        return _raise_errors([
+            MockEntity(n, self.metadata(n)) if self._lookup(n) else MockEntity(n, error_message='Not found')
+            for n in entity_names
+        ], self._raises(raise_error))
+
+    def get_one_series(self, series_name, raise_error=None):
+        return self.get_series([series_name], raise_error)[0]
+
+    def get_series(self, series_names, raise_error=None):
+        self._network('get_series', tuple(series_names))
+        return _raise_errors([self._series(n) for n in series_names], self._raises(raise_error))
+
+    def get_many_series(self, series, include_not_modified=False):
+        names = [s if isinstance(s, str) else s[0] for s in series]
+        self._network('get_many_series', tuple(names))
+        return (self._series(n) for n in names)
+
+    def _raises(self, raise_error):
+        return self.raise_error if raise_error is None else raise_error
+
+    def _series(self, code):
+        found = self._lookup(code)
+        if found is None:
+            return MockSeries(code, error_message='Not found')
+        _, values = found
+        return MockSeries(code, self.metadata(code), [d.to_pydatetime() for d in values.index], list(values.to_numpy()))
+
+    def get_unified_series(self, *series_entries, frequency=SeriesFrequency.HIGHEST, weekdays=None,
+                           calendar_merge_mode=CalendarMergeMode.AVAILABLE_IN_ANY, currency='',
+                           start_point=None, end_point=None, raise_error=None):
+        import pandas as pd
+
+        entries = [SeriesEntry(e) if isinstance(e, str) else e for e in series_entries]
+        self._network('get_unified_series', tuple(e.name for e in entries))
+        found = [self._lookup(e.name) for e in entries]
+        present = [(i, entry, f) for i, (entry, f) in enumerate(zip(entries, found)) if f is not None]
+        dates = pd.DatetimeIndex([])
+        frame = pd.DataFrame(index=dates)
+        if present:
+            ranks = [FREQUENCIES.index(freq) for _, _, (freq, _) in present]
+            if frequency == SeriesFrequency.HIGHEST:
+                target = FREQUENCIES[max(ranks)]
+            elif frequency == SeriesFrequency.LOWEST:
+                target = FREQUENCIES[min(ranks)]
+            else:
+                target = SeriesFrequency(frequency).name.lower()
+
+            converted = {i: _convert(values, freq, target, entry) for i, entry, (freq, values) in present}
+            spans = [(s.first_valid_index(), s.last_valid_index()) for s in converted.values()]
+            if calendar_merge_mode == CalendarMergeMode.AVAILABLE_IN_ALL:
+                first, last = max(a for a, _ in spans), min(b for _, b in spans)
+            else:
+                first, last = min(a for a, _ in spans), max(b for _, b in spans)
+            first = _point(start_point, first, spans, start=True)
+            last = _point(end_point, last, spans, start=False)
+            if first <= last:
+                dates = calendar(target, first, last)
+            frame = pd.DataFrame({i: s.reindex(dates) for i, s in converted.items()}, index=dates)
+            for i, entry, _ in present:
+                frame[i] = _fill_missing(frame[i], entry.missing_value_method)
+        # one entry per requested series, in request order; missing ones are error entries
+        return _raise_errors(MockUnifiedSeriesList(
+            [
+                MockUnifiedSeries(e.name, self.metadata(e.name), [None if v != v else float(v) for v in frame[i]])
+                if i in frame else MockUnifiedSeries(e.name, {}, [], 'Not found')
+                for i, e in enumerate(entries)
+            ],
+            [d.to_pydatetime() for d in dates],
+        ), self._raises(raise_error))
+
+    ############ module emulation ############
+
+    def install(self):
+        """Register this mock as ``macrobond_data_api`` (and its ``common.types``/``common.enums``) in sys.modules."""
+        root = types.ModuleType('macrobond_data_api')
+        for name in ('get_one_series', 'get_series', 'get_many_series', 'get_one_entity', 'get_entities',
+                     'get_unified_series'):
+            setattr(root, name, getattr(self, name))
+        common = types.ModuleType('macrobond_data_api.common')
+        types_module = types.ModuleType('macrobond_data_api.common.types')
+        types_module.SeriesEntry = SeriesEntry
+        types_module.StartOrEndPoint = StartOrEndPoint
+        types_module.GetEntitiesError = GetEntitiesError
+        enums = types.ModuleType('macrobond_data_api.common.enums')
+        for cls in (SeriesFrequency, CalendarMergeMode, CalendarDateMode, SeriesMissingValueMethod,
+                    SeriesToHigherFrequencyMethod, SeriesToLowerFrequencyMethod, SeriesPartialPeriodsMethod):
+            setattr(enums, cls.__name__, cls)
+        root.common, common.types, common.enums = common, types_module, enums
+        sys.modules.update({
+            'macrobond_data_api': root,
+            'macrobond_data_api.common': common,
+            'macrobond_data_api.common.types': types_module,
+            'macrobond_data_api.common.enums': enums,
+        })
+        return root
+
+
+def record(client, codes, path):
+    """Download ``codes`` with a real ``client`` and save them for ``MockMacrobond.load``."""
+    import pandas as pd
+
+    data = {}
+    for code, series in zip(codes, client.get_many_series(codes)):
+        frame = series.values_to_pd_data_frame()
+        data[code] = (
+            str(series.metadata.get('Frequency', 'monthly')).lower(),
+            pd.Series(frame['value'].to_numpy(dtype='float64'), index=pd.DatetimeIndex(frame['date']), name=code),
+        )
+    MockMacrobond(data).save(path)
+
+
+############ unified series helpers ############
+
+def _span(frequency, periods):
+    # a time span covering ``periods`` periods of ``frequency``
+    import pandas as pd
+
+    if frequency in MONTHS:
+        return pd.DateOffset(months=MONTHS[frequency] * periods)
+    if frequency == 'weekly':
+        return pd.Timedelta(weeks=periods)
+    return pd.Timedelta(days=periods * 7 // 5 + 7)  # business days
+
+
+# Macrobond conversion methods in terms of the local alignment engine
+_UP = {SeriesToHigherFrequencyMethod.LINEAR_INTERPOLATION: 'linear'}
+_DOWN = {
+    SeriesToLowerFrequencyMethod.FLOW: 'sum',
+    SeriesToLowerFrequencyMethod.AVERAGE: 'average',
+    SeriesToLowerFrequencyMethod.FIRST: 'first',
+}
+
+
+def _convert(values, frequency, target, entry):
+    # the series at the target frequency, indexed by target period starts
+    return convert(
+        values, frequency, target,
+        up=_UP.get(entry.to_higher_frequency_method, 'step'),
+        down=_DOWN.get(entry.to_lower_frequency_method, 'last'),
+    )
+
+
+def _point(point, default, spans, start):
+    import pandas as pd
+
+    if point is None:
+        return default
+    if point.time:
+        return pd.Timestamp(point.time)
+    if point.mode == CalendarDateMode.DATA_IN_ALL_SERIES:
+        return max(a for a, _ in spans) if start else min(b for _, b in spans)
+    return min(a for a, _ in spans) if start else max(b for _, b in spans)
+
+
+def _fill_missing(values, method):
+    if method == SeriesMissingValueMethod.PREVIOUS_VALUE:
+        return values.ffill()
+    if method == SeriesMissingValueMethod.ZERO_VALUE:
+        return values.fillna(0.0)
+    if method == SeriesMissingValueMethod.LINEAR_INTERPOLATION:
+        return values.interpolate(limit_area='inside')
+    return values
@@ -0,0 +1,216 @@
+"""Batched prefetch plan for all dashboard sections.
+
+Instead of one request per notebook cell, the planner collects the series
+every section needs, dedupes them and pulls them in as few bulk calls as
+possible:
+
+* all plain series share one ``get_many_series`` call, including the inputs
+  of the multi series sections that can be aligned locally (see below);
+* all other multi series sections with the same currency and target frequency share one
+  ``get_unified_series`` call.  It is made with ``AVAILABLE_IN_ANY`` so no section loses dates to
+  another one, and each section then drops the rows where any of its own
+  inputs is missing, which is what ``AVAILABLE_IN_ALL`` would have returned.
+
+Each section then gets its slice of the downloaded data from memory, as a
+frame indexed by date.
+
+Given a ``MetadataResolver``, the plan looks up the natural frequency and
+currency of every referenced series in one batch.  Lower frequency inputs
+are converted up to the highest frequency of their section, and sections
+whose inputs are all in the section currency already are aligned locally
+(``brazil_dash.align``) from the plain series, so ratios cost no extra
+request.  Only sections that need a currency conversion still go through
+``get_unified_series``.
+"""
+
+from .cache import api_types, revision_stamp
+
+
+def _in_currency(metadata, currency):
+    # series without a currency (ratios, indices, ...) are never converted by Macrobond either
+    value = metadata.get('Currency')
+    return not value or str(value).lower() == str(currency).lower()
+
+
+class UnifiedGroup:
+    """The inputs of one bulk ``get_unified_series`` call."""
+
+    def __init__(self, currency, frequency=None):
+        self.currency = currency
+        self.frequency = frequency  # None leaves it to Macrobond (highest frequency of the call)
+        self.inputs = []  # deduped on (code, conversion method)
+
+    def position(self, inp):
+        # index of the entry matching ``inp`` or None
+        for i, existing in enumerate(self.inputs):
+            if existing.code == inp.code and existing.to_higher_frequency == inp.to_higher_frequency:
+                return i
+        return None
+
+    def accepts(self, inp):
+        # the same code may appear only once per call, otherwise the columns
+        # returned by to_pd_data_frame() collapse into one
+        return self.position(inp) is not None or inp.code not in [i.code for i in self.inputs]
+
+    def __repr__(self):
+        return 'UnifiedGroup(%r, %r, %r)' % (self.currency, self.frequency, [i.code for i in self.inputs])
+
+
+class FetchPlan:
+    """Collects the series of ``sections`` into the smallest set of bulk requests."""
+
+    def __init__(self, sections, resolver=None, local=True):
+        self.sections = list(sections)
+        self.series = []
+        self.groups = []
+        self.frequencies = {}  # section name -> common frequency picked by the resolver
+        self.local = {}  # section name -> aligned inputs, for the sections aligned here instead of by Macrobond
+        self._natural = {}  # code -> natural frequency of the locally aligned series
+        self._slots = {}  # section name -> [(group, position), ...]
+        self.revisions = {}  # code -> revision stamp, so the cache does not serve data from an earlier revision
+        metadata = {}
+        if resolver is not None:
+            metadata = resolver.resolve([code for s in self.sections for code in s.codes])  # one batch for everything
+            self.revisions = {code: revision_stamp(m) for code, m in metadata.items()}
+        for section in self.sections:
+            if not section.unified:
+                self._add_series(section.codes[0])
+                continue
+            frequency, inputs = None, section.inputs
+            if resolver is not None:
+                frequency, inputs = resolver.align(section.inputs)
+                self.frequencies[section.name] = frequency
+                if local and all(_in_currency(metadata[code], section.currency) for code in section.codes):
+                    self.local[section.name] = inputs
+                    for code in section.codes:
+                        self._add_series(code)
+                        self._natural[code] = str(metadata[code]['Frequency']).lower()
+                    continue
+            self._slots[section.name] = [self._place(section.currency, frequency, inp) for inp in inputs]
+
+    def _add_series(self, code):
+        if code not in self.series:
+            self.series.append(code)
+
+    def _place(self, currency, frequency, inp):
+        for group in self.groups:
+            if group.currency == currency and group.frequency == frequency and group.accepts(inp):
+                break
+        else:
+            group = UnifiedGroup(currency, frequency)
+            self.groups.append(group)
+        if group.position(inp) is None:
+            group.inputs.append(inp)
+        return group, group.position(inp)
+
+    ############ reporting ############
+
+    @property
+    def naive_requests(self):
+        """Requests the cell-by-cell script makes: one per section."""
+        return len(self.sections)
+
+    @property
+    def requests(self):
+        """Requests this plan makes."""
+        return (1 if self.series else 0) + len(self.groups)
+
+    def conversions(self):
+        """``[(section name, code, method)]`` for every input converted to a higher frequency."""
+        conversions = []
+        for section in self.sections:
+            if section.name in self.local:
+                inputs = self.local[section.name]
+            else:
+                inputs = [group.inputs[position] for group, position in self._slots.get(section.name, [])]
+            conversions.extend((section.name, i.code, i.to_higher_frequency) for i in inputs if i.to_higher_frequency)
+        return conversions
+
+    def summary(self):
+        references = sum(len(s.inputs) for s in self.sections)
+        unique = len(set(self.series) | {i.code for g in self.groups for i in g.inputs})
+        return '%d sections, %d series references (%d unique): %d bulk requests instead of %d, %d saved' % (
+            len(self.sections), references, unique, self.requests, self.naive_requests,
+            self.naive_requests - self.requests,
+        )
+
+    ############ execution ############
+
+    def execute(self, cache, fetcher=None, store=None):
+        """Fetch everything through ``cache`` and return ``{section name: date-indexed DataFrame}``.
+
+        With a ``ConcurrentFetcher`` the bulk requests are sent at the same time.
+        With a ``SeriesStore`` the plain series are served from the local
+        columnar store, which only downloads observations it does not have yet.
+        """
+        return self.assemble(self.download(cache, fetcher, store))
+
+    def download(self, cache, fetcher=None, store=None):
+        """Send the bulk requests; returns the raw results for ``assemble``."""
+        tasks = {i: (lambda group=group: self._fetch_group(cache, group)) for i, group in enumerate(self.groups)}
+        if self.series and store is not None:
+            tasks['series'] = lambda: store.get_many_series(self.series)  # synced by revision stamps already
+        elif self.series:
+            tasks['series'] = lambda: cache.get_many_series(self.series, revisions=self.revisions)
+        return fetcher.gather(tasks) if fetcher is not None else {key: task() for key, task in tasks.items()}
+
+    def assemble(self, results):
+        """Cut (and for local sections, align) the downloaded data into one frame per section."""
+        import pandas as pd
+
+        from .align import ALL, align
+
+        series = results.get('series', {})
+        group_frames = [results[i] for i in range(len(self.groups))]
+
+        values = {}  # code -> date-indexed values, shared by the local sections using it
+
+        def value_series(code):
+            if code not in values:
+                frame = series[code]
+                index = pd.DatetimeIndex(frame['date'])
+                values[code] = pd.Series(frame['value'].to_numpy(dtype='float64'), index=index)
+            return values[code]
+
+        frames = {}
+        for section in self.sections:
+            if not section.unified:
+                frames[section.name] = series[section.codes[0]].set_index('date')
+            elif section.name in self.local:
+                inputs = self.local[section.name]
+                frames[section.name] = align(
+                    {i.column: value_series(i.code) for i in inputs},
+                    {i.column: self._natural[i.code] for i in inputs},
+                    target=self.frequencies[section.name],
+                    merge=ALL,
+                    up={i.column: i.to_higher_frequency for i in inputs},
+                )
+            else:
+                parts = []
+                for (group, position), inp in zip(self._slots[section.name], section.inputs):
+                    frame = group_frames[self.groups.index(group)].set_index('date')
+                    parts.append(frame.iloc[:, position].rename(inp.column))
+                frames[section.name] = pd.concat(parts, axis=1).dropna()  # dates available in all of the inputs
+        return frames
+
+    def _fetch_group(self, cache, group):
+        mda = api_types(cache.client)
+        entries = []
+        for inp in group.inputs:
+            kwargs = {}
+            if inp.to_higher_frequency:
+                method = inp.to_higher_frequency.upper()
+                kwargs['to_higher_frequency_method'] = mda.SeriesToHigherFrequencyMethod[method]
+            entries.append(mda.SeriesEntry(inp.code, missing_value_method=mda.SeriesMissingValueMethod.NONE, **kwargs))
+        options = {}
+        if group.frequency:
+            options['frequency'] = mda.SeriesFrequency[group.frequency.upper()]
+        return cache.get_unified_series(
+            *entries,
+            revisions=self.revisions,
+            **options,
+            currency=group.currency,
+            calendar_merge_mode=mda.CalendarMergeMode.AVAILABLE_IN_ANY,
+            start_point=mda.StartOrEndPoint.data_in_any_series(),
+            end_point=mda.StartOrEndPoint.data_in_any_series(),
+        )
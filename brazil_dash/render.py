@@ -0,0 +1,165 @@
+"""Headless chart rendering in the Macrobond desktop style.
+
+A ``ChartSpec`` describes one chart: its title, the y axis label and the
+lines to plot.  ``draw`` renders a spec in the Macrobond desktop style (15x10
+figure, y axis and its label at the top right, y gridlines only, title
+aligned left).  It builds the figure directly on the Agg canvas, so no
+pyplot state or display is involved.
+
+``render_all`` renders many specs in a process pool and writes one file per
+chart and format.  ``render_pdf`` writes them all into a single multi-page
+PDF.  matplotlib is only imported once a chart is actually drawn.
+
+``thin`` reduces a long frame to the rows that keep the shape of its plotted
+lines (largest triangle three buckets, ``lttb``), for charts that are drawn
+at screen resolution anyway.
+"""
+
+import os
+import time
+
+FORMATS = ('png', 'svg', 'pdf')
+
+
+class Line:
+    """One plotted column of the section frame."""
+
+    def __init__(self, column, color='red', label=None):
+        self.column = column
+        self.color = color
+        self.label = label
+
+    def __repr__(self):
+        return 'Line(%r, %r)' % (self.column, self.color)
+
+
+class ChartSpec:
+    """Everything needed to draw a section's chart."""
+
+    def __init__(self, title, ylabel, lines, legend=None, figsize=(15, 10)):
+        self.title = title
+        self.ylabel = ylabel
+        self.lines = list(lines)
+        self.legend = legend  # legend location, e.g. 'upper left'; None for no legend
+        self.figsize = figsize
+
+    def __repr__(self):
+        return 'ChartSpec(%r)' % self.title
+
+
+def draw(spec, frame):
+    """Draw ``spec`` with the data in the date-indexed ``frame`` and return the matplotlib Figure."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=spec.figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    for line in spec.lines:
+        ax.plot(frame.index, frame[line.column], line.color, label=line.label)
+    ax.set_ylabel(spec.ylabel, ha='left', y=1, rotation=0, labelpad=0)  # label at the top, like Macrobond desktop
+    ax.yaxis.set_label_position('right')
+    ax.yaxis.tick_right()
+    if spec.legend:
+        ax.legend(loc=spec.legend)
+    ax.grid(axis='y')
+    ax.set_title(spec.title, loc='left')
+    return fig
+
+
+def lttb(x, y, points):
+    """Positions of the ``points`` observations of ``y`` over ``x`` that keep the shape of the line best.
+
+    Largest triangle three buckets: the first and last observations are
+    kept, the others are split into ``points - 2`` buckets and from each
+    the one spanning the largest triangle with the point kept before it and
+    the mean of the next bucket is kept.
+    """
+    import numpy as np
+
+    n = len(y)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)  # bucket boundaries, excluding both ends
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nx, ny = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            nx, ny = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - nx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (ny - y[a]))
+        a = lo + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def thin(frame, columns, points):
+    """The rows of ``frame`` picked by ``lttb`` for any of ``columns``, or ``frame`` if it is short enough."""
+    import numpy as np
+
+    if not points or len(frame) <= points:
+        return frame
+    x = getattr(frame.index, 'asi8', None)  # dates in the index's own unit, only their spacing matters
+    x = np.arange(len(frame), dtype='float64') if x is None else x.astype('float64')
+    keep = []
+    for column in columns:
+        values = frame[column].to_numpy(dtype='float64')
+        finite = np.flatnonzero(np.isfinite(values))  # gaps stay gaps, they are not bridged by a kept point
+        keep.append(finite[lttb(x[finite], values[finite], points)])
+    return frame.iloc[np.unique(np.concatenate(keep))] if keep else frame
+
+
+def _render_one(name, spec, frame, out_dir, formats):
+    # (paths, seconds spent), timed here because it may run in another process
+    started = time.perf_counter()
+    fig = draw(spec, frame)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, '%s.%s' % (name, fmt))
+        fig.savefig(path, format=fmt)
+        paths.append(path)
+    return paths, time.perf_counter() - started
+
+
+def render_all(charts, out_dir, formats=('png',), workers=None, timings=None):
+    """Render ``{name: (spec, frame)}`` into ``out_dir`` and return ``{name: [paths]}``.
+
+    Charts are spread over a pool of ``workers`` processes (one per CPU by
+    default); with a single worker or chart they are drawn in this process.
+    A ``timings`` dict receives the seconds each chart took to render.
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError('unsupported formats: %s' % ', '.join(sorted(unknown)))
+    os.makedirs(out_dir, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, len(charts)) or 1
+    if workers == 1:
+        results = {name: _render_one(name, spec, frame, out_dir, formats) for name, (spec, frame) in charts.items()}
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                name: pool.submit(_render_one, name, spec, frame, out_dir, formats)
+                for name, (spec, frame) in charts.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+    if timings is not None:
+        timings.update({name: seconds for name, (_, seconds) in results.items()})
+    return {name: paths for name, (paths, _) in results.items()}
+
+
+def render_pdf(charts, path):
+    """Write ``{name: (spec, frame)}`` as one multi-page PDF, one chart per page, in order."""
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with PdfPages(path) as pdf:
+        for spec, frame in charts.values():
+            pdf.savefig(draw(spec, frame))
+    return path
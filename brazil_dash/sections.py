@@ -0,0 +1,151 @@
+"""Declared list of the dashboard sections and the Macrobond series each one needs.
+
+Every section is handed over as a frame indexed by date.  A section with a
+single input is fetched as a plain series and has one ``value`` column.  A
+section with several inputs has one column per input, named after
+``Input.column``, on a common calendar: aligned locally from the plain
+series, or by a currency-converting unified query when an input is not in
+the section's currency.  The section's
+``transforms`` pipeline then derives the columns its ``chart`` plots.
+"""
+
+from .render import ChartSpec, Line
+from .transforms import Pipeline, diff, pct_change, ratio_to, scale, since_year
+
+
+class Input:
+    """One series used by a section.
+
+    ``to_higher_frequency`` names a ``SeriesToHigherFrequencyMethod`` member
+    (e.g. ``'linear_interpolation'``) for series that have to be converted to
+    the frequency of the other inputs.
+    """
+
+    def __init__(self, column, code, to_higher_frequency=None):
+        self.column = column
+        self.code = code
+        self.to_higher_frequency = to_higher_frequency
+
+    def __repr__(self):
+        return 'Input(%r, %r)' % (self.column, self.code)
+
+
+class Section:
+    """A dashboard section: the series behind it, how they are transformed and how they are charted."""
+
+    def __init__(self, name, inputs, transforms=None, chart=None, currency='USD'):
+        self.name = name
+        self.inputs = list(inputs)
+        self.transforms = transforms or Pipeline()
+        self.chart = chart
+        self.currency = currency  # only used for unified (multi series) sections
+
+    @property
+    def title(self):
+        return self.chart.title if self.chart else self.name
+
+    @property
+    def unified(self):
+        return len(self.inputs) > 1
+
+    @property
+    def codes(self):
+        return [i.code for i in self.inputs]
+
+    def transform(self, frame):
+        """Apply the section's transforms to its date-indexed input frame."""
+        return self.transforms.run(frame)
+
+    def __repr__(self):
+        return 'Section(%r)' % self.name
+
+
+PERCENT = 'Percent'
+USD_BILLION = 'USD, billion'
+
+
+def country_sections(country='Brazil', prefix='br', codes=None):
+    """The dashboard sections for one country.
+
+    Series codes are the country's Macrobond prefix followed by the
+    indicator (``'br' + 'naac1005'``).  ``codes`` maps indicators to full
+    codes for countries where a series is numbered differently.
+    """
+    codes = dict(codes or {})
+
+    def code(indicator):
+        return codes.get(indicator, prefix + indicator)
+
+    gdp = code('naac1005')
+    # the since_year cut-offs match the format of the existing Macrobond sheet;
+    # drop a Line from a chart to leave that series out of the figure
+    return [
+        Section('nominal_gdp', [Input('value', gdp)],
+                Pipeline(since_year(2008), scale(1e9)),
+                ChartSpec('%s, Nominal GDP in USD' % country, USD_BILLION, [Line('value')])),
+        Section('real_gdp', [Input('value', gdp)],
+                # monthly series, so the yearly change is over 12 observations
+                Pipeline(pct_change(12, out='y/y change'), since_year(2009)),
+                ChartSpec('%s, Real GDP y/y %% change' % country, PERCENT, [Line('y/y change')])),
+        Section('reserve_assets', [Input('value', code('fofi1030'))],
+                Pipeline(since_year(2010), scale(1e9)),
+                ChartSpec('%s: Reserve Assets' % country, USD_BILLION, [Line('value')])),
+        Section('imports_exports', [
+            Input('Imports', code('trad1153')),
+            Input('Exports', code('trad1015')),
+        ], Pipeline(since_year(2012), scale(1e9)),
+            ChartSpec('%s: Imports and Exports' % country, USD_BILLION, [
+                Line('Imports', 'blue', 'Imports'),
+                Line('Exports', 'red', 'Exports'),
+            ], legend='upper left')),
+        Section('trade_balance', [
+            Input('Imports', code('trad1153')),
+            Input('Exports', code('trad1015')),
+            Input('GDP', gdp),
+        ], Pipeline(
+            since_year(2012),
+            diff('Exports', 'Imports', out='trade balance'),
+            ratio_to('trade balance', 'GDP', pct=True),
+        ), ChartSpec('%s: Trade Balance in USD as %% of GDP' % country, PERCENT, [Line('trade balance')])),
+        Section('inflation', [Input('value', code('pric1011'))],
+                Pipeline(pct_change(12, out='y/y'), pct_change(3, out='3m/3m'), pct_change(1, out='1m/1m')),
+                ChartSpec('%s, Inflation: y/y, 3m/3m, 1m/1m' % country, PERCENT, [
+                    Line('y/y', 'blue', 'Y/Y pct change'),
+                    Line('3m/3m', 'red', '3m/3m pct change'),
+                    Line('1m/1m', 'green', '1m/1m pct change'),
+                ], legend='upper left')),
+        Section('current_account', [
+            Input('Current Account', code('bopa1000')),
+            Input('GDP', gdp),
+        ], Pipeline(ratio_to('Current Account', 'GDP', out='curr_pct_gdp', pct=True)),
+            ChartSpec('%s: Current Account as %% of GDP' % country, PERCENT, [Line('curr_pct_gdp')])),
+        Section('inflation_forecast', [Input('value', code('rate0102'))],
+                Pipeline(since_year(2000)),
+                ChartSpec('%s: Central Bank Inflation Forecast' % country, PERCENT, [Line('value')])),
+        Section('primary_budget', [
+            Input('prim_budg', code('gpfi1066')),
+            Input('GDP', gdp),
+        ], Pipeline(ratio_to('prim_budg', 'GDP', out='prim_pct_gdp', pct=True), since_year(2016)),
+            ChartSpec('%s: Primary Budget Deficit in USD as %% of GDP' % country, PERCENT, [Line('prim_pct_gdp')])),
+        Section('budget_deficit', [
+            Input('gov_budg', code('gpfi1098')),
+            Input('GDP', gdp),
+        ], Pipeline(ratio_to('gov_budg', 'GDP', out='budg_pct_gdp', pct=True), since_year(2015)),
+            ChartSpec('%s: Budget Deficit in USD as %% of GDP' % country, PERCENT, [Line('budg_pct_gdp')])),
+        Section('government_debt', [
+            Input('gov_budg', code('fofi1043'), to_higher_frequency='linear_interpolation'),
+            Input('GDP', gdp),
+        ], Pipeline(ratio_to('gov_budg', 'GDP', out='budg_pct_gdp', pct=True), since_year(2007)),
+            ChartSpec('%s: General Government Debt as %% of GDP' % country, PERCENT, [Line('budg_pct_gdp')])),
+    ]
+
+
+SECTIONS = country_sections('Brazil', 'br')
+
+
+def get_section(name, sections=SECTIONS):
+    """Look a section up by name."""
+    for section in sections:
+        if section.name == name:
+            return section
+    raise KeyError('unknown section %r' % name)
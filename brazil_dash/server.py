@@ -0,0 +1,364 @@
+"""Local HTTP service for the dashboard charts and their data.
+
+One process fetches, transforms and renders for everybody watching the
+dashboard::
+
+    brazil-dash --serve 8050
+    brazil-dash --serve 0.0.0.0:8050 --sections inflation,current_account
+
+    GET /                               page with every chart
+    GET /charts/<section>.png|svg       chart, ?points=N overrides the downsampling
+    GET /data/<section>.csv|json        the transformed frame behind the chart
+    GET /metrics                        Prometheus metrics, when tracing is on
+
+A section's revision is the set of its series' revision stamps, taken from
+the metadata resolver (which asks Macrobond again every ``ttl`` seconds, in
+one batch for all sections).  Transformed frames and rendered bytes are
+kept in an in-memory LRU keyed by that revision, and concurrent requests
+for the same revision wait for a single fetch and render instead of
+starting their own.  The ETag of a response is derived from the revision,
+so a browser revalidating an unchanged chart gets a 304 without anything
+being fetched or drawn.  Sections with series that carry no revision stamps
+are versioned by their content instead, which is checked again at most
+every ``refresh`` seconds.
+
+Long series are downsampled for drawing with ``thin`` (largest triangle
+three buckets) to ``points`` observations per line; the data endpoints
+always return every observation.
+"""
+
+import collections
+import hashlib
+import html
+import io
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .build import BuildManifest, content_stamp
+from .cache import revision_stamp
+from .metadata import DEFAULT_METADATA_TTL
+from .planner import FetchPlan
+from .trace import get_tracer
+
+DEFAULT_PORT = 8050
+DEFAULT_POINTS = 2000  # per line, a 15 inch chart is not drawn any finer
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+MAX_POINTS = 100000
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+CHART_FORMATS = ('png', 'svg')
+DATA_FORMATS = ('csv', 'json')
+KINDS = {'charts': 'chart', 'data': 'data'}  # URL prefix -> what it serves, for error messages
+
+
+def _sizeof(value):
+    if isinstance(value, bytes):
+        return len(value)
+    return int(value.memory_usage(index=True).sum())  # a DataFrame
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU of bytes and frames, bounded by their total size."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = collections.OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value):
+        size = _sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+
+class Dashboard:
+    """The sections' frames and charts at their current revision, computed once per revision."""
+
+    def __init__(self, sections, cache, resolver, fetcher=None, store=None, derived=None, points=DEFAULT_POINTS,
+                 max_bytes=DEFAULT_MAX_BYTES, refresh=DEFAULT_METADATA_TTL):
+        self.sections = {s.name: s for s in sections}
+        self.cache = cache
+        self.resolver = resolver
+        self.fetcher = fetcher
+        self.store = store
+        self.derived = derived
+        self.points = points
+        self.refresh = refresh  # seconds the content stamp of a section without revision stamps is trusted
+        self.lru = LRUCache(max_bytes)
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> lock held while the value is being computed
+        self._content = {}  # section name -> (checked, content stamp), for sections without revision stamps
+
+    def revisions(self):
+        """``{section name: revision or None}``, None for sections with unstamped series."""
+        metadata = self.resolver.resolve([code for s in self.sections.values() for code in s.codes])
+        revisions = {}
+        for name, section in self.sections.items():
+            stamps = [revision_stamp(metadata[code]) for code in section.codes]
+            revisions[name] = None if None in stamps else _digest(stamps)
+        return revisions
+
+    def frame(self, name):
+        """``(revision, transformed frame)`` of a section."""
+        section = self.sections[name]
+        revision = self._revision(section) or self._recent(name)
+        if revision is None:
+            # no revision stamps: fetch (through the cache) and let the content decide
+            raw = self._fetch([section])[name]
+            revision = self._remember(name, raw)
+            return revision, self._once(('frame', name, revision), lambda: self._transform(section, raw))
+        return revision, self._once(('frame', name, revision),
+                                    lambda: self._transform(section, self._fetch([section])[name]))
+
+    def etag(self, name, fmt, points=None, revision=None):
+        """ETag of a chart (``points`` set) or data response, None while the revision is unknown."""
+        revision = revision or self._revision(self.sections[name]) or self._recent(name)
+        if revision is None:
+            return None
+        spec = BuildManifest.spec_hash(self.sections[name], [fmt])
+        return '"%s"' % _digest([name, revision, spec, fmt, points])[:32]
+
+    def chart(self, name, fmt, points=None):
+        """``(etag, bytes)`` of a section's chart in ``fmt`` (png or svg)."""
+        points = self.points if points is None else points
+        revision, frame = self.frame(name)
+        section = self.sections[name]
+        return self.etag(name, fmt, points, revision), self._once(
+            ('chart', name, revision, fmt, points), lambda: self._render(section, frame, fmt, points))
+
+    def data(self, name, fmt):
+        """``(etag, bytes)`` of a section's transformed frame as csv or json."""
+        revision, frame = self.frame(name)
+        return self.etag(name, fmt, revision=revision), self._once(
+            ('data', name, revision, fmt), lambda: _encode(frame, fmt))
+
+    def warm(self):
+        """Fetch every section whose current revision is not in memory yet, with one plan."""
+        revisions = self.revisions()
+        current = {name: revision or self._recent(name) for name, revision in revisions.items()}
+        missing = [s for name, s in self.sections.items()
+                   if current[name] is None or self.lru.get(('frame', name, current[name])) is None]
+        if not missing:
+            return []
+        raw = self._fetch(missing)
+        for section in missing:
+            frame = raw[section.name]
+            revision = revisions[section.name] or self._remember(section.name, frame)
+            self._once(('frame', section.name, revision), lambda: self._transform(section, frame))
+        return [s.name for s in missing]
+
+    ############ internals ############
+
+    def _revision(self, section):
+        stamps = [revision_stamp(m) for m in self.resolver.resolve(section.codes).values()]
+        return None if None in stamps else _digest(stamps)
+
+    def _recent(self, name):
+        # the content stamp of a section without revision stamps, while it is younger than ``refresh``
+        checked, stamp = self._content.get(name, (None, None))
+        if checked is not None and time.monotonic() - checked < self.refresh:
+            return stamp
+        return None
+
+    def _remember(self, name, raw):
+        stamp = content_stamp(raw)
+        self._content[name] = (time.monotonic(), stamp)
+        return stamp
+
+    def _once(self, key, compute):
+        # the cached value, or compute it; concurrent callers of the same key wait for the first one
+        tracer = get_tracer()
+        value = self.lru.get(key)
+        if value is not None:
+            tracer.count('cache_hits', 1, cache=key[0])
+            return value
+        with self._lock:
+            pending = self._pending.setdefault(key, threading.Lock())
+        with pending:
+            value = self.lru.get(key)
+            if value is None:
+                tracer.count('cache_misses', 1, cache=key[0])
+                value = compute()
+                self.lru.put(key, value)
+            else:
+                tracer.count('cache_hits', 1, cache=key[0])
+        with self._lock:
+            self._pending.pop(key, None)
+        return value
+
+    def _fetch(self, sections):
+        tracer = get_tracer()
+        with tracer.span('plan', sections=len(sections)):
+            plan = FetchPlan(sections, resolver=self.resolver)
+        with tracer.span('fetch', requests=plan.requests):
+            downloaded = plan.download(self.cache, self.fetcher, self.store)
+        with tracer.span('align', sections=len(plan.local)):
+            return plan.assemble(downloaded)
+
+    def _transform(self, section, raw):
+        with get_tracer().span('transform', section=section.name):
+            if self.derived is not None:
+                return self.derived.transform(section, raw)
+            return section.transform(raw)
+
+    def _render(self, section, frame, fmt, points):
+        from .render import draw, thin
+
+        with get_tracer().span('render', section=section.name, format=fmt):
+            buffer = io.BytesIO()
+            draw(section.chart, thin(frame, [line.column for line in section.chart.lines], points)).savefig(
+                buffer, format=fmt)
+            return buffer.getvalue()
+
+
+def _digest(parts):
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def _encode(frame, fmt):
+    if fmt == 'csv':
+        return frame.to_csv(index_label='date').encode()
+    return frame.to_json(orient='split', date_format='iso').encode()
+
+
+def index_page(dashboard):
+    """HTML page showing every chart, with links to its data."""
+    items = []
+    for name, section in dashboard.sections.items():
+        quoted = urllib.parse.quote(name)
+        items.append('<section><img src="/charts/%s.png" alt="%s" width="750"><p>%s: '
+                     '<a href="/data/%s.csv">csv</a> <a href="/data/%s.json">json</a> '
+                     '<a href="/charts/%s.svg">svg</a></p></section>' % (
+                         quoted, html.escape(section.title), html.escape(name), quoted, quoted, quoted))
+    return ('<!doctype html><html><head><meta charset="utf-8"><title>Dashboard</title></head><body>\n%s\n'
+            '</body></html>\n' % '\n'.join(items)).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'brazil-dash'
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def _serve(self, body):
+        dashboard = self.server.dashboard
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        parts = [urllib.parse.unquote(p) for p in url.path.strip('/').split('/')]
+        try:
+            if url.path == '/':
+                return self._send(200, 'text/html; charset=utf-8', index_page(dashboard), body=body)
+            if url.path == '/metrics':
+                tracer = get_tracer()
+                if not tracer.enabled:
+                    return self._error(404, 'tracing is off')
+                return self._send(200, 'text/plain; version=0.0.4', tracer.prometheus().encode(), body=body)
+            if len(parts) != 2 or parts[0] not in KINDS or '.' not in parts[1]:
+                return self._error(404, 'not found')
+            name, fmt = parts[1].rsplit('.', 1)
+            formats = CHART_FORMATS if parts[0] == 'charts' else DATA_FORMATS
+            if name not in dashboard.sections or fmt not in formats:
+                return self._error(404, 'no %s %s.%s' % (KINDS[parts[0]], name, fmt))
+            points = None
+            if parts[0] == 'charts':
+                points = query.get('points', [dashboard.points])[-1]
+                try:
+                    points = int(points)
+                except ValueError:
+                    return self._error(400, 'points must be an integer')
+                if not 0 <= points <= MAX_POINTS:
+                    return self._error(400, 'points must be between 0 (no downsampling) and %d' % MAX_POINTS)
+
+            # answered from the metadata alone when the client has the current version
+            etag = dashboard.etag(name, fmt, points)
+            tags = _etags(self.headers.get('If-None-Match'))
+            if etag is not None and (etag in tags or '*' in tags):
+                return self._send(304, None, b'', etag=etag, body=False)
+            if parts[0] == 'charts':
+                etag, content = dashboard.chart(name, fmt, points)
+            else:
+                etag, content = dashboard.data(name, fmt)
+            return self._send(200, CONTENT_TYPES[fmt], content, etag=etag, body=body)
+        except Exception as exc:
+            # e.g. Macrobond being unreachable; the next request tries again
+            return self._error(502, '%s: %s' % (type(exc).__name__, exc))
+
+    def _send(self, status, content_type, content, etag=None, body=True):
+        get_tracer().count('http_requests', 1, status=status)
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')  # cache, but revalidate every time
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if body:
+            self.wfile.write(content)
+
+    def _error(self, status, message):
+        return self._send(status, 'text/plain; charset=utf-8', (message + '\n').encode())
+
+
+def _etags(header):
+    if not header:
+        return ()
+    if header.strip() == '*':
+        return ('*',)
+    return tuple(tag.strip().replace('W/', '', 1) for tag in header.split(','))
+
+
+class DashboardServer(ThreadingHTTPServer):
+    """``ThreadingHTTPServer`` serving a ``Dashboard``."""
+
+    daemon_threads = True
+
+    def __init__(self, dashboard, host='127.0.0.1', port=DEFAULT_PORT, quiet=False):
+        self.dashboard = dashboard
+        handler = _Handler
+        if quiet:
+            handler = type('_QuietHandler', (_Handler,), {'log_message': lambda self, *args: None})
+        super().__init__((host, port), handler)
+
+
+def serve(dashboard, host='127.0.0.1', port=DEFAULT_PORT, warm=True):
+    """Serve ``dashboard`` until interrupted; ``warm`` fetches and transforms every section first."""
+    if warm:
+        dashboard.warm()
+    server = DashboardServer(dashboard, host, port)
+    print('serving %d sections on http://%s:%d/' % (len(dashboard.sections), host, server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
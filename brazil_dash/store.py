@@ -0,0 +1,246 @@
+"""Columnar local time-series store with incremental appends.
+
+All series live in one Arrow IPC file: a ``date`` column plus one column per
+series code.  The file is uncompressed and read through a memory map, so
+reading a handful of columns does not parse the rest of the file.
+
+A series is downloaded in full only the first time it is seen.  After that,
+``sync`` asks Macrobond only for the observations after the stored last date
+minus ``revision_window`` days, so late revisions are still picked up, and
+merges them in.  Series whose revision stamp did not change are not
+requested at all.  Payload sizes and parse time therefore stay flat as
+history grows.
+
+pyarrow is an optional dependency and is only needed when a store is used;
+``available()`` tells whether it is installed, without importing it.
+"""
+
+import datetime
+import importlib.util
+import json
+import os
+import threading
+import time
+
+from .cache import DEFAULT_CACHE_DIR, FetchError, api_types, default_client, revision_stamp
+from .files import atomic_write
+from .trace import get_tracer
+
+DEFAULT_REVISION_WINDOW = 366  # days re-requested before the last stored observation
+
+STORE_FILE = 'series.arrow'
+STATE_FILE = 'series.json'
+
+
+def available():
+    """True if pyarrow is installed, so a ``SeriesStore`` can be used."""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ImportError('the series store needs pyarrow, install it with: pip install pyarrow') from None
+    return pyarrow
+
+
+class SeriesStore:
+    """Local columnar copy of Macrobond series, kept up to date incrementally.
+
+    ``get_many_series`` has the same shape as ``SeriesCache.get_many_series``
+    (``{code: date/value frame}``) so a store can serve the plain series of a
+    ``FetchPlan``.
+    """
+
+    def __init__(self, directory=os.path.join(DEFAULT_CACHE_DIR, 'store'), client=None, resolver=None,
+                 revision_window=DEFAULT_REVISION_WINDOW):
+        self.directory = directory
+        self.resolver = resolver
+        self.revision_window = revision_window
+        self._client = client
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._state = self._load_state()  # code -> {'revision', 'last', 'synced'}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = default_client()
+        return self._client
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, STORE_FILE)
+
+    ############ reading ############
+
+    def codes(self):
+        """Series codes held in the store."""
+        table = self._table()
+        return [] if table is None else [c for c in table.column_names if c != 'date']
+
+    def read(self, codes=None):
+        """Date-indexed frame with one column per code (all codes by default), straight from the memory map."""
+        import pandas as pd
+
+        table = self._table()
+        if table is None:
+            return pd.DataFrame(columns=list(codes or []), index=pd.DatetimeIndex([], name='date'))
+        columns = ['date'] + list(codes if codes is not None else self.codes())
+        return table.select(columns).to_pandas().set_index('date')
+
+    def get_many_series(self, names):
+        """Sync ``names`` and return ``{code: date/value frame}`` with the stored observations."""
+        names = list(dict.fromkeys(names))
+        self.sync(names)
+        frame = self.read(names)
+        return {
+            name: frame[name].dropna().rename('value').rename_axis('date').reset_index()
+            for name in names
+        }
+
+    def get_one_series(self, name):
+        return self.get_many_series([name])[name]
+
+    ############ syncing ############
+
+    def sync(self, codes):
+        """Bring ``codes`` up to date: full download for new codes, only the recent tail for known ones."""
+        with self._lock:
+            self._sync(list(dict.fromkeys(codes)))
+
+    def _sync(self, codes):
+        stored = set(self.codes())
+        revisions = {}
+        if self.resolver is not None:
+            revisions = {code: revision_stamp(m) for code, m in self.resolver.resolve(codes).items()}
+
+        new = [code for code in codes if code not in stored]
+        stale = [
+            code for code in codes
+            if code in stored and (revisions.get(code) is None or revisions[code] != self._state[code].get('revision'))
+        ]
+        tracer = get_tracer()
+        tracer.count('cache_hits', len(codes) - len(new) - len(stale), cache='store')
+        tracer.count('cache_misses', len(new) + len(stale), cache='store')
+        if not new and not stale:
+            return
+
+        frame = self.read()
+        updates = []
+        if new:
+            updates.append((None, self._download_full(new)))
+        for start, tail in self._download_tails(stale):
+            updates.append((start, tail))
+        for start, update in updates:
+            frame = _merge(frame, update, start)
+
+        self._write(frame)
+        now = time.time()
+        for code in new + stale:
+            values = frame[code].dropna()
+            self._state[code] = {
+                'revision': revisions.get(code),
+                'last': values.index[-1].isoformat() if len(values) else None,
+                'synced': now,
+            }
+        self._save_state()
+
+    def _download_full(self, codes):
+        import pandas as pd
+
+        columns = {}
+        for code, series in zip(codes, self.client.get_many_series(codes)):
+            if series.is_error:
+                raise FetchError('%s: %s' % (code, series.error_message))
+            values = series.values_to_pd_data_frame()
+            columns[code] = pd.Series(values['value'].to_numpy(dtype='float64'), index=pd.DatetimeIndex(values['date']))
+        return pd.DataFrame(columns)
+
+    def _download_tails(self, codes):
+        # one unified request per frequency, starting at the earliest window start of the group;
+        # without a resolver the frequencies are unknown and a unified request would convert the
+        # lower frequency series, so those codes are downloaded in full, each at its own frequency
+        import pandas as pd
+
+        if self.resolver is None:
+            if codes:
+                yield None, self._download_full(codes)
+            return
+
+        mda = api_types(self.client)
+        groups = {}
+        for code in codes:
+            groups.setdefault(self.resolver.frequency(code), []).append(code)
+
+        for frequency, group in groups.items():
+            lasts = [self._state[c]['last'] for c in group if self._state[c].get('last')]
+            if not lasts or not frequency:
+                yield None, self._download_full(group)
+                continue
+            start = datetime.datetime.fromisoformat(min(lasts)) - datetime.timedelta(days=self.revision_window)
+            result = self.client.get_unified_series(
+                *[mda.SeriesEntry(code, missing_value_method=mda.SeriesMissingValueMethod.NONE) for code in group],
+                frequency=mda.SeriesFrequency[frequency.upper()],
+                calendar_merge_mode=mda.CalendarMergeMode.AVAILABLE_IN_ANY,
+                start_point=mda.StartOrEndPoint.point_in_time(start),
+                raise_error=False,
+            )
+            errors = ['%s: %s' % (code, series.error_message) for code, series in zip(group, result) if series.is_error]
+            if errors:
+                raise FetchError('; '.join(errors))
+            index = pd.DatetimeIndex(result.dates)
+            tail = pd.DataFrame({code: list(series.values) for code, series in zip(group, result)}, index=index)
+            yield _like(pd.Timestamp(start), index), tail.astype('float64')
+
+    ############ persistence ############
+
+    def _table(self):
+        pa = _pyarrow()
+        if not os.path.exists(self.path):
+            return None
+        # the table's buffers point into the mapping, which stays open as long as they are referenced
+        return pa.ipc.open_file(pa.memory_map(self.path)).read_all()
+
+    def _write(self, frame):
+        pa = _pyarrow()
+        table = pa.Table.from_pandas(frame.rename_axis('date').reset_index(), preserve_index=False)
+        # replaced, not rewritten: open memory maps keep reading the previous file
+        with atomic_write(self.path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    def _load_state(self):
+        try:
+            with open(os.path.join(self.directory, STATE_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        with atomic_write(os.path.join(self.directory, STATE_FILE)) as f:
+            json.dump(self._state, f, indent=1, sort_keys=True)
+
+
+def _like(timestamp, index):
+    # make ``timestamp`` comparable with ``index`` (both naive or both in the index's time zone)
+    if index.tz is not None:
+        return timestamp.tz_localize(index.tz) if timestamp.tz is None else timestamp.tz_convert(index.tz)
+    return timestamp.tz_convert(None) if timestamp.tz is not None else timestamp
+
+
+def _merge(frame, update, start):
+    # replaces the values of update's columns from ``start`` on (everything when
+    # start is None) with the downloaded ones and appends the new dates
+    if frame.empty and not len(frame.columns):
+        return update.sort_index()
+    merged = frame.reindex(frame.index.union(update.index))
+    for code in update.columns:
+        if start is None or code not in merged.columns:
+            merged[code] = update[code].reindex(merged.index)
+        else:
+            recent = merged.index >= start
+            merged.loc[recent, code] = update[code].reindex(merged.index[recent]).to_numpy()
+    return merged.dropna(how='all').sort_index()
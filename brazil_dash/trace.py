@@ -0,0 +1,291 @@
+"""Runtime instrumentation: spans, counters and their export.
+
+A ``Tracer`` records timed spans (``metadata``, ``fetch``, and ``transform``
+and ``render`` per section) and counters (API calls, rows and bytes
+received, cache hits and misses).  ``write_json`` dumps everything as a
+trace, ``write_prometheus`` as a Prometheus text-format file for the node
+exporter's textfile collector::
+
+    tracer = set_tracer(Tracer())
+    client = TracedClient(fetcher.wrap())
+    ...
+    tracer.write_json('trace.json')
+    tracer.write_prometheus('brazil_dash.prom')
+
+Library code reports to ``get_tracer()``, which is a ``NullTracer`` until a
+tracer is installed.  Its methods do nothing, so disabled instrumentation
+costs a function call per event.
+"""
+
+import inspect
+import json
+import os
+import threading
+import time
+
+from .files import atomic_write
+
+PREFIX = 'brazil_dash'
+
+# help texts of the exported counters, anything else is exported without one
+COUNTERS = {
+    'api_calls': 'Macrobond API calls by function.',
+    'api_rows': 'Observations received from Macrobond.',
+    'api_bytes': 'Approximate payload received from Macrobond (8 byte date and value per observation).',
+    'cache_hits': 'Requests served from a local cache, by cache.',
+    'cache_misses': 'Requests a local cache could not serve, by cache.',
+    'http_requests': 'Responses of the dashboard server by status.',
+}
+
+_BYTES_PER_ROW = 16
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """Tracer used while instrumentation is disabled; records nothing."""
+
+    enabled = False
+
+    def span(self, name, **attrs):
+        return _NULL_SPAN
+
+    def record(self, name, duration, **attrs):
+        pass
+
+    def count(self, name, value=1, **labels):
+        pass
+
+
+class Span:
+    """A timed operation; use it as a context manager."""
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.start = None
+        self.duration = None
+
+    def set(self, **attrs):
+        """Attach attributes (rows, section, ...) to the span."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        self.tracer._stack().pop()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer._finish(self)
+        return False
+
+
+class Tracer:
+    """Collects spans and counters of one dashboard run."""
+
+    enabled = True
+
+    def __init__(self):
+        self.spans = []  # finished spans as dicts, in completion order
+        self.counters = {}  # (name, sorted label items) -> value
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = time.time()
+
+    def span(self, name, **attrs):
+        return Span(self, name, attrs)
+
+    def record(self, name, duration, **attrs):
+        """Add a span that was timed elsewhere (e.g. in a worker process)."""
+        with self._lock:
+            self.spans.append({
+                'name': name,
+                'parent': None,
+                'start': None,
+                'duration': duration,
+                'thread': None,
+                'attrs': attrs,
+            })
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def merge(self, data):
+        """Add the spans and counters of another tracer's ``to_dict()``, e.g. one that ran in a worker process."""
+        offset = data['started'] - self._started
+        with self._lock:
+            for span in data['spans']:
+                span = dict(span)
+                if span['start'] is not None:
+                    span['start'] += offset
+                self.spans.append(span)
+        for counter in data['counters']:
+            self.count(counter['name'], counter['value'], **counter['labels'])
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _finish(self, span):
+        with self._lock:
+            self.spans.append({
+                'name': span.name,
+                'parent': span.parent,
+                'start': span.start - self._started,
+                'duration': span.duration,
+                'thread': threading.current_thread().name,
+                'attrs': span.attrs,
+            })
+
+    ############ export ############
+
+    def totals(self):
+        """``{span name: (count, total seconds)}``."""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                count, seconds = totals.get(span['name'], (0, 0.0))
+                totals[span['name']] = (count + 1, seconds + span['duration'])
+        return totals
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+            counters = [{'name': n, 'labels': dict(labels), 'value': v} for (n, labels), v in self.counters.items()]
+        return {'started': self._started, 'spans': spans, 'counters': counters}
+
+    def write_json(self, path):
+        _write(path, json.dumps(self.to_dict(), indent=1, default=str))
+        return path
+
+    def prometheus(self):
+        """The counters and span totals in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+        seen = set()
+        for (name, labels), value in counters:
+            metric = '%s_%s_total' % (PREFIX, name)
+            if metric not in seen:
+                seen.add(metric)
+                if name in COUNTERS:
+                    lines.append('# HELP %s %s' % (metric, COUNTERS[name]))
+                lines.append('# TYPE %s counter' % metric)
+            lines.append('%s%s %s' % (metric, _labels(labels), value))
+
+        metric = '%s_span_seconds' % PREFIX
+        lines.append('# HELP %s Time spent per stage.' % metric)
+        lines.append('# TYPE %s summary' % metric)
+        for name, (count, seconds) in sorted(self.totals().items()):
+            labels = _labels([('span', name)])
+            lines.append('%s_sum%s %.6f' % (metric, labels, seconds))
+            lines.append('%s_count%s %d' % (metric, labels, count))
+        lines.append('# TYPE %s_last_run_timestamp_seconds gauge' % PREFIX)
+        lines.append('%s_last_run_timestamp_seconds %.3f' % (PREFIX, self._started))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        _write(path, self.prometheus())
+        return path
+
+
+def _labels(items):
+    if not items:
+        return ''
+    escaped = (
+        '%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in items
+    )
+    return '{%s}' % ','.join(escaped)
+
+
+def _write(path, text):
+    # atomic, so a scraper never reads half a file
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with atomic_write(path) as f:
+        f.write(text)
+
+
+_tracer = NullTracer()
+
+
+def get_tracer():
+    """The active tracer (a ``NullTracer`` unless one was installed)."""
+    return _tracer
+
+
+def set_tracer(tracer):
+    """Install ``tracer`` (None disables tracing) and return it."""
+    global _tracer
+    _tracer = tracer if tracer is not None else NullTracer()
+    return _tracer
+
+
+############ client instrumentation ############
+
+def _rows(result):
+    # observations in a Series, Entity, UnifiedSeriesList or a list of them
+    if isinstance(result, list):
+        return sum(_rows(r) for r in result)
+    if hasattr(result, 'series') and hasattr(result, 'dates'):
+        return len(result.dates) * len(result.series)
+    values = getattr(result, 'values', None)
+    return len(values) if isinstance(values, (list, tuple)) else 0
+
+
+class TracedClient:
+    """Client proxy counting every Macrobond call and the observations it returned.
+
+    Each call also gets an ``api.<function>`` span.  Classes and other
+    attributes are passed through, like in ``GuardedClient``.
+    """
+
+    def __init__(self, client, tracer=None):
+        self._client = client
+        self._tracer = tracer
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        attr = getattr(self._client, name)
+        if not callable(attr) or inspect.isclass(attr):
+            return attr
+
+        def traced(*args, **kwargs):
+            tracer = self._tracer or get_tracer()
+            with tracer.span('api.' + name):
+                result = attr(*args, **kwargs)
+                if inspect.isgenerator(result):
+                    result = list(result)
+            rows = _rows(result)
+            tracer.count('api_calls', function=name)
+            tracer.count('api_rows', rows, function=name)
+            tracer.count('api_bytes', rows * _BYTES_PER_ROW, function=name)
+            return result
+
+        traced.__name__ = name
+        return traced
@@ -0,0 +1,199 @@
+"""Small declarative transform engine for the section frames.
+
+Sections declare their data manipulation as a ``Pipeline`` of steps::
+
+    Pipeline(pct_change(12, out='y/y change'), since_year(2009))
+
+The pipeline works on frames indexed by a ``DatetimeIndex``.  It runs every
+step as a NumPy operation on the column arrays, so there are no temporary
+``year`` columns, row-wise ``.apply`` calls or intermediate frames.
+``since_year`` only moves a start position (found with a binary search on the
+sorted index).  The steps after it compute on the remaining tail, and the
+result frame is built once at the end.  NumPy and pandas are imported when a
+pipeline first runs, so declaring sections stays cheap.
+"""
+
+
+class Step:
+    """One pipeline step.
+
+    ``apply(index, columns, start)`` updates the ``columns`` dict of float
+    arrays and returns the new start row.  Rows before ``start`` are dropped
+    from the result, so steps never need to compute them.
+    """
+
+    def apply(self, index, columns, start):
+        raise NotImplementedError
+
+    def lookback(self, depths):
+        """Update ``depths`` ({column: earlier rows a value depends on}) for this step's outputs.
+
+        The default is right for element-wise steps; steps reading earlier
+        rows have to add their reach, so incremental updates stay exact.
+        """
+
+    def __repr__(self):
+        args = ', '.join('%s=%r' % kv for kv in vars(self).items())
+        return '%s(%s)' % (type(self).__name__, args)
+
+
+def _target(columns, like):
+    import numpy as np
+
+    # output array for a step, same length as the inputs; rows before the
+    # start position are never read, so the array is left uninitialised
+    return np.empty_like(columns[like])
+
+
+class since_year(Step):
+    """Keep observations dated ``year``-01-01 or later."""
+
+    def __init__(self, year):
+        self.year = year
+
+    def apply(self, index, columns, start):
+        import pandas as pd
+
+        first = pd.Timestamp(self.year, 1, 1)
+        if getattr(index, 'tz', None) is not None:
+            first = first.tz_localize(index.tz)
+        return max(start, int(index.searchsorted(first, side='left')))
+
+
+class scale(Step):
+    """Express ``columns`` (all of them by default) in units of ``unit``, e.g. ``scale(1e9)`` for billions."""
+
+    def __init__(self, unit, *columns):
+        self.unit = unit
+        self.columns = columns
+
+    def apply(self, index, columns, start):
+        import numpy as np
+
+        for name in self.columns or list(columns):
+            values = columns[name]
+            np.divide(values[start:], self.unit, out=values[start:])  # arrays are owned by the pipeline
+        return start
+
+
+class pct_change(Step):
+    """Percent change (as a fraction) over ``periods`` observations of ``column``, written to ``out``.
+
+    Matches ``Series.pct_change(periods, fill_method=None)``: missing values
+    are not forward filled first.
+    """
+
+    def __init__(self, periods, column='value', out=None):
+        self.periods = periods
+        self.column = column
+        self.out = out or column
+
+    def apply(self, index, columns, start):
+        import numpy as np
+
+        values = columns[self.column]
+        result = _target(columns, self.column)
+        lag = self.periods
+        head = min(start + lag, len(values))
+        result[start:head] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(values[head:], values[head - lag:len(values) - lag], out=result[head:])
+        result[head:] -= 1.0
+        columns[self.out] = result
+        return start
+
+    def lookback(self, depths):
+        depths[self.out] = depths.get(self.column, 0) + self.periods
+
+
+class ratio_to(Step):
+    """``column / other`` written to ``out``; multiplied by 100 when ``pct`` is set."""
+
+    def __init__(self, column, other, out=None, pct=False):
+        self.column = column
+        self.other = other
+        self.out = out or column
+        self.pct = pct
+
+    def apply(self, index, columns, start):
+        import numpy as np
+
+        result = _target(columns, self.column)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(columns[self.column][start:], columns[self.other][start:], out=result[start:])
+        if self.pct:
+            result[start:] *= 100.0
+        columns[self.out] = result
+        return start
+
+    def lookback(self, depths):
+        depths[self.out] = max(depths.get(self.column, 0), depths.get(self.other, 0))
+
+
+class diff(Step):
+    """``a - b`` written to ``out``, e.g. ``diff('Exports', 'Imports', out='trade balance')``."""
+
+    def __init__(self, a, b, out):
+        self.a = a
+        self.b = b
+        self.out = out
+
+    def apply(self, index, columns, start):
+        import numpy as np
+
+        result = _target(columns, self.a)
+        np.subtract(columns[self.a][start:], columns[self.b][start:], out=result[start:])
+        columns[self.out] = result
+        return start
+
+    def lookback(self, depths):
+        depths[self.out] = max(depths.get(self.a, 0), depths.get(self.b, 0))
+
+
+class Pipeline:
+    """An ordered list of steps applied to a date-indexed frame."""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+
+    def run(self, frame):
+        """Return a new frame with all steps applied; ``frame`` itself is left untouched."""
+        import pandas as pd
+
+        index = frame.index
+        # one float copy per input column, every step then works on these in place
+        columns = {name: frame[name].to_numpy(dtype='float64', copy=True) for name in frame.columns}
+        start = 0
+        for step in self.steps:
+            start = step.apply(index, columns, start)
+        return pd.DataFrame({name: values[start:] for name, values in columns.items()}, index=index[start:])
+
+    def lookback(self):
+        """How many earlier rows a result row depends on, at most."""
+        depths = {}
+        for step in self.steps:
+            step.lookback(depths)
+        return max(depths.values(), default=0)
+
+    def update(self, frame, previous, changed):
+        """``run(frame)``, reusing ``previous`` where possible.
+
+        ``previous`` is the result for an earlier version of the inputs that
+        agrees with ``frame`` on all rows before position ``changed``
+        (new observations were appended or recent ones revised).  Only the
+        rows from ``changed`` on are computed, from a window reaching back
+        ``lookback()`` rows; the result is identical to a full ``run``.
+        """
+        import pandas as pd
+
+        if changed >= len(frame) and len(frame):
+            return previous[previous.index <= frame.index[-1]]  # observations were only dropped from the end
+        first = changed - self.lookback()
+        if first <= 0:
+            return self.run(frame)
+        cut = frame.index[changed]
+        tail = self.run(frame.iloc[first:])
+        return pd.concat([previous[previous.index < cut], tail[tail.index >= cut]])
+
+    def __repr__(self):
+        return 'Pipeline(%s)' % ', '.join(map(repr, self.steps))
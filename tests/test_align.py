@@ -0,0 +1,128 @@
+"""Local frequency conversion and calendar merging (brazil_dash.align)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from brazil_dash.align import ALL, ANY, align, convert, downsample, period_start, upsample
+
+
+def _series(dates, values, name='x'):
+    return pd.Series(values, index=pd.DatetimeIndex(dates), name=name, dtype='float64')
+
+
+QUARTERLY = _series(['2024-01-01', '2024-04-01', '2024-07-01'], [0.0, 3.0, 6.0])
+MONTHLY = _series(pd.date_range('2024-01-01', periods=8, freq='MS'), [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0])
+
+
+def _by_days(dates, values):
+    # straight lines in time between the observations of ``values``, as the months differ in length
+    return np.interp(pd.DatetimeIndex(dates).as_unit('ns').asi8, values.index.as_unit('ns').asi8, values.to_numpy())
+
+
+@pytest.mark.parametrize('method', ['linear', 'linear_interpolation', 'LINEAR_INTERPOLATION'])
+def test_upsample_linear(method):
+    result = upsample(QUARTERLY, 'quarterly', 'monthly', method)
+
+    assert list(result.index) == list(pd.date_range('2024-01-01', '2024-09-01', freq='MS'))
+    # straight lines between the observations, nothing after the last one
+    np.testing.assert_allclose(result.to_numpy()[:7], _by_days(result.index[:7], QUARTERLY))
+    np.testing.assert_allclose(result.to_numpy()[[0, 3, 6]], [0, 3, 6])
+    assert result.iloc[7:].isna().all()
+    assert result.name == 'x'
+
+
+@pytest.mark.parametrize('method', ['step', 'same', 'auto'])
+def test_upsample_step(method):
+    result = upsample(QUARTERLY, 'quarterly', 'monthly', method)
+    np.testing.assert_array_equal(result.to_numpy(), [0, 0, 0, 3, 3, 3, 6, 6, 6])
+
+
+def test_upsample_skips_missing_observations():
+    values = _series(['2020-01-01', '2021-01-01', '2022-01-01'], [4.0, np.nan, 12.0])
+    result = upsample(values, 'annual', 'quarterly', 'linear')
+
+    assert len(result) == 12
+    np.testing.assert_allclose(result.to_numpy()[:9], _by_days(result.index[:9], values.dropna()))
+    assert result.iloc[8] == 12 and 7.9 < result.iloc[4] < 8.1
+
+
+def test_upsample_to_business_days():
+    result = upsample(_series(['2024-01-01', '2024-02-01'], [1.0, 2.0]), 'monthly', 'daily', 'step')
+
+    assert result.index[0] == pd.Timestamp('2024-01-01') and result.index[-1] == pd.Timestamp('2024-02-29')
+    assert (result.index.weekday < 5).all()
+    assert (result[:'2024-01-31'] == 1).all() and (result['2024-02-01':] == 2).all()
+
+
+@pytest.mark.parametrize('method, expected', [
+    ('sum', [6, 15]),
+    ('flow', [6, 15]),
+    ('average', [2, 5]),
+    ('last', [3, 6]),
+    ('first', [1, 4]),
+])
+def test_downsample_drops_incomplete_periods(method, expected):
+    result = downsample(MONTHLY, 'monthly', 'quarterly', method)
+
+    assert list(result.index) == [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-04-01')]
+    np.testing.assert_array_equal(result.to_numpy(), expected)
+
+
+def test_downsample_partial_periods():
+    result = downsample(MONTHLY, 'monthly', 'quarterly', 'sum', partial=True)
+    np.testing.assert_array_equal(result.to_numpy(), [6, 15, 15])
+
+
+def test_downsample_daily_to_monthly():
+    days = pd.bdate_range('2024-01-01', '2024-03-31')
+    result = downsample(_series(days, np.arange(len(days))), 'daily', 'monthly', 'last')
+
+    assert list(result.index) == list(pd.date_range('2024-01-01', periods=3, freq='MS'))
+    np.testing.assert_array_equal(result.to_numpy(), [days.get_loc(d) for d in ('2024-01-31', '2024-02-29',
+                                                                                  '2024-03-29')])
+
+
+def test_unsupported_method():
+    with pytest.raises(ValueError, match='unsupported conversion method'):
+        downsample(MONTHLY, 'monthly', 'quarterly', 'median')
+
+
+def test_convert_picks_the_direction():
+    pd.testing.assert_series_equal(convert(MONTHLY, 'monthly', 'monthly'), MONTHLY)
+    assert len(convert(QUARTERLY, 'quarterly', 'monthly')) == 9
+    assert len(convert(MONTHLY, 'monthly', 'quarterly')) == 2
+
+
+def test_period_start_keeps_the_time_zone():
+    index = pd.DatetimeIndex(['2024-05-17 13:00', '2024-08-02'], tz='America/Sao_Paulo')
+    starts = period_start(index, 'quarterly')
+
+    assert list(starts) == [pd.Timestamp('2024-04-01', tz='America/Sao_Paulo'),
+                            pd.Timestamp('2024-07-01', tz='America/Sao_Paulo')]
+
+
+def test_align_merges_calendars():
+    series = {'gdp': QUARTERLY, 'cpi': MONTHLY}
+    frequencies = {'gdp': 'quarterly', 'cpi': 'monthly'}
+
+    both = align(series, frequencies, merge=ALL)
+    assert both.index.name == 'date'
+    assert list(both.columns) == ['gdp', 'cpi']
+    assert list(both.index) == list(pd.date_range('2024-01-01', '2024-07-01', freq='MS'))
+    np.testing.assert_allclose(both['gdp'].to_numpy(), _by_days(both.index, QUARTERLY))
+    np.testing.assert_array_equal(both['cpi'].to_numpy(), MONTHLY.to_numpy()[:7])
+
+    either = align(series, frequencies, merge=ANY, up='step')
+    assert len(either) == 9
+    assert np.isnan(either['cpi'].iloc[-1]) and either['gdp'].iloc[-1] == 6
+
+    quarterly = align(series, frequencies, target='quarterly', down={'cpi': 'sum'})
+    np.testing.assert_array_equal(quarterly['cpi'].to_numpy(), [6, 15])
+
+
+def test_align_rejects_unknown_options():
+    with pytest.raises(ValueError):
+        align({'x': MONTHLY}, {'x': 'monthly'}, merge='inner')
+    with pytest.raises(ValueError):
+        align({'x': MONTHLY}, {'x': 'monthly'}, target='hourly')
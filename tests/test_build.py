@@ -0,0 +1,44 @@
+"""Incremental builds after a data release, through the series cache alone (no columnar store)."""
+
+import pandas as pd
+import pytest
+
+from brazil_dash.build import incremental_build
+from brazil_dash.cache import SeriesCache
+from brazil_dash.metadata import MetadataResolver
+from brazil_dash.mock import MockMacrobond
+from brazil_dash.planner import FetchPlan
+from brazil_dash.sections import SECTIONS
+
+NAMES = ('inflation', 'current_account')
+
+
+def _build(api, directory):
+    # a fresh process: the metadata is asked for again, the series cache is still within its TTL
+    resolver = MetadataResolver(directory, client=api, ttl=0)
+    cache = SeriesCache(directory, client=api, metadata=resolver)
+    sections = [s for s in SECTIONS if s.name in NAMES]
+    return incremental_build(sections, cache, resolver, directory + '/out'), cache, resolver, sections
+
+
+# current_account is aligned locally in USD, or downloaded as a unified (currency converting) group
+@pytest.mark.parametrize('currencies', [{}, {'brbopa1000': 'brl'}])
+def test_release_is_drawn_from_the_new_data(tmp_path, currencies):
+    api = MockMacrobond(currencies=currencies)
+    directory = str(tmp_path)
+    first, _, _, _ = _build(api, directory)
+    assert sorted(first.built) == sorted(NAMES)
+
+    api.publish('brpric1011', 1)
+    api.publish('brbopa1000', 1)
+    second, cache, resolver, sections = _build(api, directory)
+    assert sorted(second.built) == sorted(NAMES)
+    plan = FetchPlan(sections, resolver=resolver)
+    frames = plan.execute(cache)
+    fresh = plan.execute(SeriesCache(str(tmp_path / 'empty'), client=api, metadata=resolver))
+    assert frames['inflation'].index[-1] == api.series('brpric1011')[1].index[-1]
+    for name in NAMES:
+        pd.testing.assert_frame_equal(frames[name], fresh[name])
+
+    third, _, _, _ = _build(api, directory)
+    assert third.built == []
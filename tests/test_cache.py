@@ -0,0 +1,105 @@
+"""SeriesCache: TTL, revalidation against the revision stamps and LRU eviction."""
+
+import pandas as pd
+import pytest
+
+from brazil_dash.cache import FetchError, SeriesCache, revision_stamp
+from brazil_dash.mock import MockMacrobond
+
+
+def _downloads(api):
+    return [detail for name, detail in api.calls if name in ('get_many_series', 'get_unified_series')]
+
+
+def test_fresh_entries_are_served_from_disk(tmp_path):
+    api = MockMacrobond()
+    first = SeriesCache(str(tmp_path), client=api).get_one_series('brpric1011')
+    # a new instance, as in the next run, reads the same entry
+    again = SeriesCache(str(tmp_path), client=api).get_one_series('brpric1011')
+
+    pd.testing.assert_frame_equal(first, again)
+    assert _downloads(api) == [('brpric1011',)]
+
+
+def test_misses_are_downloaded_together(tmp_path):
+    api = MockMacrobond()
+    cache = SeriesCache(str(tmp_path), client=api)
+    cache.get_one_series('brpric1011')
+    found = cache.get_many_series(['brpric1011', 'brnaac1005', 'brbopa1000'])
+
+    assert sorted(found) == ['brbopa1000', 'brnaac1005', 'brpric1011']
+    assert _downloads(api) == [('brpric1011',), ('brnaac1005', 'brbopa1000')]
+
+
+def test_stale_entries_are_revalidated(tmp_path):
+    api = MockMacrobond()
+    cache = SeriesCache(str(tmp_path), ttl=0, client=api)
+    cache.get_one_series('brpric1011')
+    cache.get_one_series('brpric1011')  # expired but unchanged: one metadata request, no download
+    assert _downloads(api) == [('brpric1011',)]
+    assert [name for name, _ in api.calls].count('get_entities') == 1
+
+    api.publish('brpric1011', 2)
+    frame = cache.get_one_series('brpric1011')
+    assert len(_downloads(api)) == 2
+    assert frame['date'].iloc[-1] == api.series('brpric1011')[1].index[-1]
+
+
+def test_known_revisions_bypass_the_ttl(tmp_path):
+    api = MockMacrobond()
+    cache = SeriesCache(str(tmp_path), client=api)
+    revisions = {'brpric1011': revision_stamp(api.metadata('brpric1011'))}
+    cache.get_one_series('brpric1011', revisions)
+    cache.get_one_series('brpric1011', revisions)
+    assert len(_downloads(api)) == 1
+
+    api.publish('brpric1011')
+    revisions = {'brpric1011': revision_stamp(api.metadata('brpric1011'))}
+    frame = cache.get_one_series('brpric1011', revisions)
+    assert len(_downloads(api)) == 2
+    assert frame['date'].iloc[-1] == api.series('brpric1011')[1].index[-1]
+
+
+def test_unified_requests_are_keyed_by_their_parameters(tmp_path):
+    api = MockMacrobond()
+    cache = SeriesCache(str(tmp_path), client=api)
+    monthly = cache.get_unified_series('brpric1011', 'brnaac1005', frequency=api.SeriesFrequency.MONTHLY)
+    cache.get_unified_series('brpric1011', 'brnaac1005', frequency=api.SeriesFrequency.MONTHLY)
+    quarterly = cache.get_unified_series('brpric1011', 'brnaac1005', frequency=api.SeriesFrequency.QUARTERLY)
+
+    assert len(_downloads(api)) == 2
+    assert len(quarterly) < len(monthly)
+
+
+def test_errors_are_not_cached(tmp_path):
+    api = MockMacrobond(strict=True)
+    cache = SeriesCache(str(tmp_path), client=api)
+    for _ in range(2):
+        with pytest.raises(FetchError, match='brmissing'):
+            cache.get_one_series('brmissing')
+    assert len(_downloads(api)) == 2
+    assert cache._index == {}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    api = MockMacrobond()
+    cache = SeriesCache(str(tmp_path), client=api)
+    cache.get_one_series('brpric1011')
+    size = max(entry['size'] for entry in cache._index.values())
+    cache.clear()
+
+    cache = SeriesCache(str(tmp_path), client=api, max_bytes=int(size * 2.5))
+    cache.get_one_series('brpric1011')
+    cache.get_one_series('brnaac1005')
+    cache.get_one_series('brpric1011')  # now more recently used than brnaac1005
+    cache.get_one_series('brbopa1000')
+
+    assert len(cache._index) == 2
+    assert sum(entry['size'] for entry in cache._index.values()) <= cache.max_bytes
+    downloads = len(_downloads(api))
+    cache.get_one_series('brpric1011')
+    cache.get_one_series('brbopa1000')
+    assert len(_downloads(api)) == downloads
+    cache.get_one_series('brnaac1005')
+    assert len(_downloads(api)) == downloads + 1
+    assert not (tmp_path / 'index.json.tmp').exists()
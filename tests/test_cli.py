@@ -0,0 +1,18 @@
+"""Command line option checks, which run before anything is fetched or drawn."""
+
+import pytest
+
+from brazil_dash.cli import main
+
+
+@pytest.mark.parametrize('formats', ['png,jpg', 'tiff', ',', ''])
+def test_unsupported_formats_are_rejected(capsys, formats):
+    with pytest.raises(SystemExit) as exit:
+        main(['--formats', formats, '--list'])
+
+    assert exit.value.code == 2
+    assert '--formats takes a comma separated list of png, svg, pdf' in capsys.readouterr().err
+
+
+def test_supported_formats():
+    assert main(['--formats', ' svg, pdf ', '--sections', 'inflation', '--list']) == 0
@@ -0,0 +1,71 @@
+"""run_countries against a client that raises for missing series, as macrobond_data_api does by default."""
+
+import pytest
+
+from brazil_dash.cache import SeriesCache
+from brazil_dash.countries import run_countries
+from brazil_dash.fetch import ConcurrentFetcher
+from brazil_dash.metadata import MetadataResolver
+from brazil_dash.mock import GetEntitiesError, MockMacrobond
+from brazil_dash.trace import Tracer, set_tracer
+
+COUNTRIES = {'br': 'Brazil', 'mx': 'Mexico'}
+
+
+class MissingCountryClient(MockMacrobond):
+    # every series of ``missing`` is unknown; raise_error keeps its real default (True)
+
+    def __init__(self, missing, **kwargs):
+        super().__init__(**kwargs)
+        self.missing = missing
+
+    def series(self, code):
+        if code.startswith(self.missing):
+            raise KeyError(code)
+        return super().series(code)
+
+
+class IgnoringClient(MissingCountryClient):
+    # raises even when asked not to, like clients predating raise_error
+
+    def get_entities(self, entity_names, raise_error=None):
+        return super().get_entities(entity_names, raise_error=True)
+
+
+@pytest.fixture(params=[MissingCountryClient, IgnoringClient])
+def backend(request, tmp_path):
+    fetcher = ConcurrentFetcher(sleep=lambda seconds: None)
+    client = fetcher.wrap(request.param('mx'))
+    resolver = MetadataResolver(str(tmp_path / 'cache'), client=client)
+    cache = SeriesCache(str(tmp_path / 'cache'), client=client, metadata=resolver)
+    yield fetcher, resolver, cache
+    fetcher.close()
+    set_tracer(None)
+
+
+def test_client_raises_by_default():
+    with pytest.raises(GetEntitiesError):
+        MissingCountryClient('mx').get_entities(['mxpric1011'])
+
+
+def test_missing_country_does_not_stop_the_others(backend, tmp_path):
+    fetcher, resolver, cache = backend
+    result = run_countries(cache, resolver, str(tmp_path / 'out'), COUNTRIES, pdf=None, workers=1, fetcher=fetcher)
+
+    assert list(result.failed) == ['mx']
+    assert 'mxnaac1005' in result.failed['mx']
+    assert len(result.reports['br'].built) == 11
+    assert fetcher.stats['retries'] == 0  # a missing series is not worth another try
+
+
+def test_worker_traces_are_merged(backend, tmp_path):
+    fetcher, resolver, cache = backend
+    tracer = set_tracer(Tracer())
+    result = run_countries(cache, resolver, str(tmp_path / 'out'), {'br': 'Brazil', 'cl': 'Chile'}, pdf=None,
+                           workers=2, fetcher=fetcher)
+
+    assert not result.failed
+    transformed = {s['attrs']['section'] for s in tracer.spans if s['name'] == 'transform'}
+    rendered = [s for s in tracer.spans if s['name'] == 'render']
+    assert len(transformed) == 11  # both countries share the section names
+    assert len(rendered) == 22
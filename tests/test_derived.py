@@ -0,0 +1,62 @@
+"""DerivedStore.transform gives the same frames as a full section.transform after every kind of data change."""
+
+import pandas as pd
+import pytest
+
+from brazil_dash.cache import SeriesCache
+from brazil_dash.derived import DerivedStore
+from brazil_dash.mock import MockMacrobond
+from brazil_dash.planner import FetchPlan
+from brazil_dash.sections import SECTIONS
+from brazil_dash.trace import Tracer, set_tracer
+
+
+@pytest.fixture(scope='module')
+def frames(tmp_path_factory):
+    return FetchPlan(SECTIONS).execute(SeriesCache(str(tmp_path_factory.mktemp('cache')), client=MockMacrobond()))
+
+
+def _revise(frame, position):
+    frame = frame.copy()
+    frame.iloc[position] = frame.iloc[position] * 1.01
+    return frame
+
+
+# (stored input, new input); real_gdp and inflation reach back 12 rows
+CHANGES = {
+    'unchanged': lambda f: (f, f),
+    'appended': lambda f: (f.iloc[:-3], f),
+    'revised_in_lookback': lambda f: (f, _revise(f, -5)),
+    'revised_before_lookback': lambda f: (f, _revise(f, 100)),
+    'revised_at_start': lambda f: (f, _revise(f, 0)),
+    'appended_and_revised': lambda f: (f.iloc[:-2], _revise(f, -8)),
+    'truncated': lambda f: (f, f.iloc[:-5]),
+}
+
+
+@pytest.mark.parametrize('change', sorted(CHANGES))
+@pytest.mark.parametrize('section', SECTIONS, ids=[s.name for s in SECTIONS])
+def test_matches_full_transform(tmp_path, frames, section, change):
+    old, new = CHANGES[change](frames[section.name])
+    store = DerivedStore(str(tmp_path))
+    store.transform(section, old)
+
+    pd.testing.assert_frame_equal(store.transform(section, new), section.transform(new))
+    # and what was stored for the new input is reused as is
+    pd.testing.assert_frame_equal(store.transform(section, new), section.transform(new))
+
+
+def test_only_changed_rows_are_recomputed(tmp_path, frames):
+    section = next(s for s in SECTIONS if s.name == 'inflation')
+    frame = frames['inflation']
+    store = DerivedStore(str(tmp_path))
+    tracer = set_tracer(Tracer())
+    try:
+        store.transform(section, frame.iloc[:-3])
+        store.transform(section, frame)
+        store.transform(section, frame)
+    finally:
+        set_tracer(None)
+
+    rows = {dict(labels)['mode']: value for (name, labels), value in tracer.counters.items() if name == 'derived_rows'}
+    assert rows == {'full': len(frame) - 3, 'incremental': 3, 'reused': 0}
@@ -0,0 +1,44 @@
+"""ConcurrentFetcher timeouts count the time an attempt runs, not the time it waits for a worker."""
+
+import threading
+import time
+
+import pytest
+
+from brazil_dash.fetch import ConcurrentFetcher, FetchTimeout
+
+
+@pytest.fixture
+def fetcher():
+    fetcher = ConcurrentFetcher(max_workers=2, rate=None, retries=0, timeout=0.5)
+    yield fetcher
+    fetcher.close()
+
+
+def test_queued_calls_do_not_time_out(fetcher):
+    # six calls of 0.3 s on two workers: the last ones wait 0.6 s, longer than the timeout, before they run
+    result = fetcher.gather({i: (lambda i=i: fetcher.call(time.sleep, 0.3) or i) for i in range(6)})
+
+    assert result == {i: i for i in range(6)}
+    assert fetcher.stats['timeouts'] == 0
+
+
+def test_hung_attempts_do_not_block_the_next_ones(fetcher):
+    release = threading.Event()
+    try:
+        for _ in range(3):
+            with pytest.raises(FetchTimeout, match='did not finish'):
+                fetcher.call(release.wait)
+        # every worker of the abandoned attempts is still blocked, new ones run anyway
+        assert fetcher.gather({i: (lambda: fetcher.call(time.sleep, 0.1)) for i in range(2)}) == {0: None, 1: None}
+        assert fetcher.stats['timeouts'] == 3
+    finally:
+        release.set()
+
+
+def test_timed_out_attempts_are_retried():
+    fetcher = ConcurrentFetcher(max_workers=1, rate=None, retries=2, timeout=0.2, sleep=lambda seconds: None)
+    durations = iter([1.0, 0.0])
+    assert fetcher.call(lambda: time.sleep(next(durations)) or 'ok') == 'ok'
+    assert fetcher.stats['timeouts'] == 1
+    assert fetcher.stats['retries'] == 1
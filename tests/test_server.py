@@ -0,0 +1,149 @@
+"""Chart downsampling and the dashboard service's ETag revalidation."""
+
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from brazil_dash.cache import SeriesCache
+from brazil_dash.metadata import MetadataResolver
+from brazil_dash.mock import MockMacrobond
+from brazil_dash.render import lttb, thin
+from brazil_dash.sections import SECTIONS
+from brazil_dash.server import Dashboard, DashboardServer
+
+############ downsampling ############
+
+
+def test_lttb_keeps_the_ends_and_the_extremes():
+    x = np.arange(1000, dtype='float64')
+    y = np.sin(x / 50)
+    y[437] = 25.0  # a spike any decent downsampling keeps
+    kept = lttb(x, y, 100)
+
+    assert len(kept) == 100
+    assert kept[0] == 0 and kept[-1] == 999
+    assert (np.diff(kept) > 0).all()
+    assert 437 in kept
+
+
+@pytest.mark.parametrize('points', [0, 2, 1000, 5000])
+def test_lttb_keeps_everything_when_there_is_nothing_to_drop(points):
+    np.testing.assert_array_equal(lttb(np.arange(1000), np.zeros(1000), points), np.arange(1000))
+
+
+def test_thin_keeps_the_rows_any_column_needs():
+    index = pd.date_range('1990-01-01', periods=3000, freq='D')
+    frame = pd.DataFrame({'a': np.cos(np.arange(3000) / 40), 'b': np.arange(3000, dtype='float64')}, index=index)
+    frame.iloc[1000:1200, 0] = np.nan
+    thinned = thin(frame, ['a', 'b'], 200)
+
+    assert 200 < len(thinned) <= 400
+    assert thinned.index.is_monotonic_increasing
+    assert thinned.index[0] == index[0] and thinned.index[-1] == index[-1]
+    # the points of 'a' are picked among its observations, the gap is not bridged
+    assert thinned['a'].notna().sum() >= 200
+    assert thinned['a'][thinned['a'].isna()].index.isin(index[1000:1200]).all()
+    assert thin(frame, ['a'], 0) is frame
+    assert thin(frame, ['a'], 5000) is frame
+
+
+############ HTTP service ############
+
+
+@pytest.fixture
+def service(tmp_path):
+    api = MockMacrobond()
+    resolver = MetadataResolver(str(tmp_path), client=api, ttl=0)
+    cache = SeriesCache(str(tmp_path), client=api, metadata=resolver)
+    dashboard = Dashboard([s for s in SECTIONS if s.name == 'inflation'], cache, resolver, points=100)
+    server = DashboardServer(dashboard, port=0, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield api, 'http://127.0.0.1:%d' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url, etag=None):
+    request = urllib.request.Request(url, headers={'If-None-Match': etag} if etag else {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers.get('ETag'), response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.headers.get('ETag'), exc.read()
+
+
+def _downloads(api):
+    return [name for name, _ in api.calls if name != 'get_entities']
+
+
+def test_unchanged_chart_is_revalidated_without_fetching(service):
+    api, url = service
+    status, etag, content = _get(url + '/charts/inflation.png')
+    assert status == 200 and etag and content.startswith(b'\x89PNG')
+    downloads = len(_downloads(api))
+
+    status, again, content = _get(url + '/charts/inflation.png', etag)
+    assert (status, again, content) == (304, etag, b'')
+    assert len(_downloads(api)) == downloads
+    assert _get(url + '/charts/inflation.png', 'W/"other", ' + etag)[0] == 304
+    assert _get(url + '/charts/inflation.png', '*')[0] == 304
+
+
+def test_new_revision_changes_the_etag(service):
+    api, url = service
+    _, etag, _ = _get(url + '/charts/inflation.png')
+    _, data_etag, before = _get(url + '/data/inflation.csv')
+    assert data_etag != etag
+
+    api.publish('brpric1011')
+    status, changed, _ = _get(url + '/charts/inflation.png', etag)
+    assert status == 200 and changed != etag
+    status, _, after = _get(url + '/data/inflation.csv', data_etag)
+    assert status == 200 and after.count(b'\n') == before.count(b'\n') + 1
+    # the downsampling is part of the version
+    assert _get(url + '/charts/inflation.png?points=0', changed)[0] == 200
+
+
+@pytest.mark.parametrize('path, status, message', [
+    ('/charts/gdp.png', 404, b'no chart gdp.png'),
+    ('/data/inflation.png', 404, b'no data inflation.png'),
+    ('/charts/inflation.png?points=x', 400, b'points must be an integer'),
+    ('/charts/inflation.png?points=-1', 400, b'points must be between'),
+    ('/metrics', 404, b'tracing is off'),
+])
+def test_errors(service, path, status, message):
+    _, url = service
+    code, _, content = _get(url + path)
+    assert code == status and content.startswith(message)
+
+
+class UnstampedClient(MockMacrobond):
+    # series without revision stamps, versioned by their content
+
+    def metadata(self, code):
+        metadata = super().metadata(code)
+        del metadata['LastModifiedTimeStamp'], metadata['LastRevisionTimeStamp']
+        return metadata
+
+
+@pytest.mark.parametrize('refresh, downloads', [(60, 1), (0, 3)])
+def test_unstamped_sections_are_fetched_once_per_refresh(tmp_path, refresh, downloads):
+    api = UnstampedClient()
+    resolver = MetadataResolver(str(tmp_path), client=api, ttl=0)
+    cache = SeriesCache(str(tmp_path), client=api, metadata=resolver, ttl=0)
+    dashboard = Dashboard([s for s in SECTIONS if s.name == 'inflation'], cache, resolver, refresh=refresh)
+
+    assert dashboard.revisions() == {'inflation': None}
+    revision, frame = dashboard.frame('inflation')
+    dashboard.chart('inflation', 'svg', 50)
+    dashboard.data('inflation', 'csv')
+
+    assert len(_downloads(api)) == downloads
+    assert (dashboard.etag('inflation', 'csv') is not None) == bool(refresh)
+    api.publish('brpric1011')
+    assert (dashboard.frame('inflation')[0] == revision) == bool(refresh)
@@ -0,0 +1,90 @@
+"""SeriesStore: merging downloaded tails and incremental syncs against MockMacrobond."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from brazil_dash.metadata import MetadataResolver
+from brazil_dash.mock import MockMacrobond
+from brazil_dash.store import SeriesStore, _like, _merge
+
+DATES = pd.date_range('2024-01-01', periods=5, freq='MS')
+
+
+def _frame():
+    return pd.DataFrame({'a': [1.0, 2.0, 3.0, 4.0, 5.0], 'b': [10.0, 20.0, 30.0, 40.0, 50.0]}, index=DATES)
+
+
+def test_merge_replaces_the_tail_and_appends():
+    update = pd.DataFrame({'a': [30.0, 4.5, 6.0]}, index=pd.DatetimeIndex(['2024-03-01', '2024-05-01', '2024-06-01']))
+    merged = _merge(_frame(), update, pd.Timestamp('2024-03-01'))
+
+    assert list(merged.index) == list(pd.date_range('2024-01-01', periods=6, freq='MS'))
+    # before the window kept, inside it replaced (2024-04 is gone from the source), new dates appended
+    np.testing.assert_array_equal(merged['a'].to_numpy(), [1, 2, 30, np.nan, 4.5, 6])
+    np.testing.assert_array_equal(merged['b'].to_numpy(), [10, 20, 30, 40, 50, np.nan])
+
+
+def test_merge_without_start_replaces_whole_columns():
+    update = pd.DataFrame({'a': [7.0, 8.0], 'c': [1.0, 2.0]}, index=DATES[3:])
+    merged = _merge(_frame(), update, None)
+
+    np.testing.assert_array_equal(merged['a'].to_numpy(), [np.nan, np.nan, np.nan, 7, 8])
+    np.testing.assert_array_equal(merged['c'].to_numpy(), [np.nan, np.nan, np.nan, 1, 2])
+    np.testing.assert_array_equal(merged['b'].to_numpy(), _frame()['b'].to_numpy())
+
+
+def test_merge_into_an_empty_store():
+    update = _frame().iloc[::-1]
+    pd.testing.assert_frame_equal(_merge(pd.DataFrame(), update, None), _frame())
+
+
+def test_merge_drops_dates_left_without_values():
+    update = pd.DataFrame({'a': [np.nan], 'b': [np.nan]}, index=DATES[-1:])
+    merged = _merge(_frame(), update, DATES[-1])
+    assert list(merged.index) == list(DATES[:-1])
+
+
+def test_like_matches_the_index_time_zone():
+    aware = pd.DatetimeIndex(DATES, tz='UTC')
+    assert _like(pd.Timestamp('2024-03-01'), aware) == pd.Timestamp('2024-03-01', tz='UTC')
+    assert _like(pd.Timestamp('2024-03-01', tz='UTC'), DATES) == pd.Timestamp('2024-03-01')
+
+
+@pytest.fixture
+def store(tmp_path):
+    pytest.importorskip('pyarrow')
+    api = MockMacrobond()
+    resolver = MetadataResolver(str(tmp_path), client=api, ttl=0)
+    return api, SeriesStore(str(tmp_path / 'store'), client=api, resolver=resolver)
+
+
+def _values(api, code):
+    return api.series(code)[1].dropna().to_numpy()
+
+
+def test_sync_downloads_only_recent_observations(store):
+    api, store = store
+    codes = ['brpric1011', 'brnaac1005', 'brbopa1000']
+    store.get_many_series(codes)
+    assert [name for name, _ in api.calls if name != 'get_entities'] == ['get_many_series']
+
+    api.publish('brpric1011', 2, revise=3)
+    api.calls.clear()
+    found = store.get_many_series(codes)
+
+    downloads = [(name, detail) for name, detail in api.calls if name != 'get_entities']
+    assert downloads == [('get_unified_series', ('brpric1011',))]  # unchanged series are not requested
+    for code in codes:
+        np.testing.assert_allclose(found[code]['value'].to_numpy(), _values(api, code))
+    assert found['brpric1011']['date'].iloc[-1] == api.series('brpric1011')[1].index[-1]
+
+
+def test_store_is_read_back_by_a_new_instance(store, tmp_path):
+    api, store = store
+    store.sync(['brpric1011'])
+    again = SeriesStore(store.directory, client=api, resolver=store.resolver)
+
+    assert again.codes() == ['brpric1011']
+    np.testing.assert_allclose(again.read()['brpric1011'].dropna().to_numpy(), _values(api, 'brpric1011'))
+    assert not list(tmp_path.glob('store/*.tmp'))